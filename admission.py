@@ -0,0 +1,166 @@
+import time
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+# ---------------------------------------------------------
+# ADMISSION CONTROL + RATE LIMITING
+# ---------------------------------------------------------
+class Overloaded(Exception):
+    """The request was shed; ``retry_after`` is a hint in whole seconds."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+class AdmissionController:
+    """Cap how many expensive renders run at once, queueing the excess.
+
+    Up to ``max_concurrent`` callers hold a slot; up to ``max_queue`` more wait
+    for one, each at most ``queue_timeout`` seconds. A caller that finds the
+    queue full, or times out in it, gets ``Overloaded`` straight away. Only
+    cache misses are meant to go through here, so cheap routes and cached
+    responses never wait behind a render, and the bounded queue keeps most
+    server threads free for them. A render nested in another on the same
+    thread reuses its slot. ``max_concurrent=0`` admits everything.
+    """
+
+    def __init__(self, max_concurrent, max_queue=16, queue_timeout=5.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.wait_seconds = 0.0
+        self.shed_by_kind = Counter()
+
+    @contextmanager
+    def slot(self, kind='render'):
+        # render جوه render (الصفحة بتحسب الـ need curve) بيكمل على نفس الـ slot،
+        # غير كده الصفحات اللي ماسكة كل الـ slots تستنى بعض لحد الـ timeout
+        if self.max_concurrent <= 0 or getattr(self._local, 'held', False):
+            yield
+            return
+        self._acquire(kind)
+        self._local.held = True
+        try:
+            yield
+        finally:
+            self._local.held = False
+            with self._cond:
+                self.active -= 1
+                self._cond.notify()
+
+    def _acquire(self, kind):
+        with self._cond:
+            if self.active < self.max_concurrent and not self.waiting:
+                self.active += 1
+                self.admitted += 1
+                return
+            if self.waiting >= self.max_queue:
+                self.shed += 1
+                self.shed_by_kind[kind] += 1
+                raise Overloaded(f"{kind}: {self.waiting} requests already queued", self.queue_timeout)
+            self.waiting += 1
+            self.queued += 1
+            started = time.monotonic()
+            deadline = started + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed += 1
+                        self.timed_out += 1
+                        self.shed_by_kind[kind] += 1
+                        raise Overloaded(f"{kind}: no render slot within {self.queue_timeout}s", self.queue_timeout)
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+                self.wait_seconds += time.monotonic() - started
+                if self.active < self.max_concurrent:
+                    self._cond.notify()
+            self.active += 1
+            self.admitted += 1
+
+    def run(self, kind, render):
+        with self.slot(kind):
+            return render()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'queue_timeout': self.queue_timeout,
+                'active': self.active,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'shed': self.shed,
+                'timed_out': self.timed_out,
+                'avg_queue_ms': round(self.wait_seconds / self.queued * 1000, 1) if self.queued else None,
+                'shed_by_kind': dict(self.shed_by_kind),
+            }
+
+
+class RateLimiter:
+    """Token bucket per key: ``burst`` requests at once, refilled at ``per_minute``.
+
+    Buckets live in memory per process (per instance on Vercel) and the
+    least recently used ones are dropped past ``max_keys``; a dropped bucket
+    simply starts full again.
+    """
+
+    def __init__(self, per_minute, burst, max_keys=10000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def hit(self, key):
+        """Take a token for ``key``: 0 when allowed, else seconds until the next token."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+                self.allowed += 1
+            else:
+                wait = (1 - tokens) / self.rate if self.rate > 0 else 60.0
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def peek(self, key):
+        """Like ``hit`` but without taking a token: 0 if one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) / self.rate if self.rate > 0 else 60.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'per_minute': round(self.rate * 60, 2),
+                'burst': self.burst,
+                'keys': len(self._buckets),
+                'allowed': self.allowed,
+                'limited': self.limited,
+            }
@@ -1,21 +1,40 @@
 import os
 import re
+import csv
 import io
-import base64
-from flask import Flask, render_template_string, request, redirect, url_for, flash
+import json
+import time
+import hashlib
+import mimetypes
+import click
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import joinedload, object_session
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-import pandas as pd
-import matplotlib
+from werkzeug.security import safe_join
+from werkzeug.http import is_resource_modified
+from jinja2 import ChoiceLoader, DictLoader
 
-# Fix for Matplotlib in Flask (Server Backend)
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from cache import BytesCache, TTLCache
+from datastore import DataStore
+import assets
+from compression import CompressionMiddleware, accepted_encodings
+from passwords import PasswordHasher, HashingBusy, default_workers
+from admission import AdmissionController, Overloaded, RateLimiter
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'AFM27SuperSecret2026')
 
+# ضغط gzip/brotli لأي رد نصي أكبر من COMPRESS_MIN_SIZE (الـ PNG والخطوط بتعدي زي ما هي)
+if os.environ.get('COMPRESS_RESPONSES', '1') != '0':
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        min_size=int(os.environ.get('COMPRESS_MIN_SIZE', '1024')),
+        gzip_level=int(os.environ.get('COMPRESS_GZIP_LEVEL', '6')),
+        brotli_quality=int(os.environ.get('COMPRESS_BROTLI_QUALITY', '5')),
+    )
+
 # ---------------------------------------------------------
 # 1. DATABASE CONFIGURATION
 # ---------------------------------------------------------
@@ -26,36 +45,113 @@ if database_url and database_url.startswith("postgres://"):
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url or 'sqlite:///users.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# بروفايلات الـ engine (DB_PROFILE، الافتراضي auto):
+# - postgres-serverless: pool صغير بيتعاد استخدامه بين الـ invocations الدافية، pre_ping عشان
+#   الاتصالات اللي الـ pooler قفلها وهي نايمة، و recycle قبل الـ idle timeout بتاعه
+# - postgres: سيرفر واحد شغال على طول
+# - sqlite: WAL + busy_timeout + synchronous=NORMAL (connect event تحت) عشان زحمة التسجيل
+#   يوم النتيجة متطلعش "database is locked". الـ WAL بيتسجل في الملف نفسه: أول تشغيل محلي
+#   بيحوّل instance/users.db (المتسجل في git) لـ WAL فبيبان متعدل في git status، وبيعمل جنبه
+#   users.db-wal و users.db-shm (متجاهلين في .gitignore). متعملوش commit للتعديل ده؛
+#   `git checkout instance/users.db` بيرجعه، أو DB_PROFILE=none للتشغيل من غير WAL
+# - none: من غير أي options (زي الأول)
+DB_ENGINE_PROFILES = {
+    'postgres-serverless': {'pool_size': 1, 'max_overflow': 4, 'pool_timeout': 10, 'pool_pre_ping': True, 'pool_recycle': 280},
+    'postgres': {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30, 'pool_pre_ping': True, 'pool_recycle': 1800},
+    'sqlite': {'connect_args': {'timeout': 30}},
+    'none': {},
+}
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '30000'))
+
+def resolve_db_profile(uri, requested='auto'):
+    if requested and requested != 'auto':
+        if requested not in DB_ENGINE_PROFILES:
+            raise ValueError(f"Unknown DB_PROFILE {requested!r}; expected one of {', '.join(DB_ENGINE_PROFILES)} or auto")
+        return requested
+    if uri.startswith('sqlite'):
+        return 'sqlite'
+    if uri.startswith('postgresql'):
+        return 'postgres-serverless' if os.environ.get('VERCEL') else 'postgres'
+    return 'none'
+
+DB_PROFILE = resolve_db_profile(app.config['SQLALCHEMY_DATABASE_URI'], os.environ.get('DB_PROFILE', 'auto'))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(DB_ENGINE_PROFILES[DB_PROFILE])
+
 db = SQLAlchemy(app)
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+    finally:
+        cursor.close()
+
+if DB_PROFILE == 'sqlite':
+    with app.app_context():
+        event.listen(db.engine, 'connect', set_sqlite_pragmas)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
 # ---------------------------------------------------------
-# 2. LOAD DATA (CSV WITH ARABIC SUPPORT)
+# 2. LOAD DATA (LAZY, ON FIRST USE, HOT RELOAD)
 # ---------------------------------------------------------
-try:
-    sheet1_df = pd.read_csv("data1.csv", encoding='utf-8-sig')
-    sheet2_df = pd.read_csv("data2.csv", encoding='utf-8-sig')
-    
-    # السطرين الجداد دول لتنظيف أسماء الأعمدة من أي مسافات مخفية
-    sheet1_df.columns = sheet1_df.columns.str.strip()
-    sheet2_df.columns = sheet2_df.columns.str.strip()
-    
-    # تنظيف الـ IDs
-    sheet1_df['ID'] = sheet1_df['ID'].astype(str).str.strip()
-    sheet2_df['ID'] = sheet2_df['ID'].astype(str).str.strip()
-except Exception as e:
-    print(f"Data Error: {e}")
-    sheet1_df = pd.DataFrame()
-    sheet2_df = pd.DataFrame()
-try:
-    residency_24_df = pd.read_csv("24.csv", encoding='utf-8-sig')
-    residency_25_df = pd.read_csv("25.csv", encoding='utf-8-sig')
-except Exception as e:
-    print(f"Residency Data Error: {e}")
-    residency_24_df = pd.DataFrame()
-    residency_25_df = pd.DataFrame()
+# pandas والـ CSVs بيتحملوا أول ما route يحتاجهم بس (dataset.py)،
+# عشان الـ cold start على Vercel لصفحة زي /login ميدفعش تمنهم.
+# لو ملفات الداتا اتغيرت (mtime + hash) النسخة الجديدة بتتبني في الخلفية وبتتبدل مرة واحدة،
+# والـ requests اللي شغالة بتكمل على القديمة. كل الكاش متفتح بـ data.version
+DATA_RELOAD_INTERVAL = float(os.environ.get('DATA_RELOAD_INTERVAL', '5'))
+
+def _load_dataset(version):
+    import dataset
+    return dataset.load_dataset(version)
+
+def _data_sources():
+    import dataset
+    return dataset.data_files()
+
+def _data_fingerprint(paths):
+    import dataset
+    return dataset.compute_data_version(paths)
+
+def _on_data_swap(old, new):
+    # الكاش متفتح بالـ version أصلًا، فده بيفضي الذاكرة والديسك بدري بدل ما نستنى الـ LRU.
+    # أول load (old=None) بيمسح كمان ملفات النسخ القديمة اللي فضلت على الديسك من تشغيل سابق
+    dropped = sum(cache.discard(lambda key: key[-1] != new.version) for cache in (chart_cache, need_curve_cache, response_cache))
+    if old is not None:
+        print(f"Data reloaded: {old.version} -> {new.version} ({dropped} cached entries dropped)")
+
+data_store = DataStore(
+    load=_load_dataset,
+    sources=_data_sources,
+    fingerprint=_data_fingerprint,
+    check_interval=DATA_RELOAD_INTERVAL,
+    validate=lambda data: not data.sheet1_df.empty,
+    on_swap=_on_data_swap,
+)
+
+def get_data():
+    return data_store.get()
+
+# كاش الرسومات (Plot 1 + Plot 2)
+chart_cache = BytesCache(
+    max_bytes=int(os.environ.get('CHART_CACHE_MB', '32')) * 1024 * 1024,
+    disk_dir=os.environ.get('CHART_CACHE_DIR') or None,
+    disk_max_bytes=int(os.environ.get('CHART_CACHE_DISK_MB', '256')) * 1024 * 1024,
+)
+
+# منحنى "How Much I Need" لكل طالب (JSON جاهز)
+need_curve_cache = BytesCache(max_bytes=8 * 1024 * 1024, suffix='.json')
+
+# صفحة النتيجة (GET) جاهزة لكل طالب، بالـ mode ونسخة الداتا ونسخة القالب
+response_cache = BytesCache(
+    max_bytes=int(os.environ.get('RESPONSE_CACHE_MB', '16')) * 1024 * 1024,
+    disk_dir=os.environ.get('RESPONSE_CACHE_DIR') or None,
+    disk_max_bytes=int(os.environ.get('RESPONSE_CACHE_DISK_MB', '256')) * 1024 * 1024,
+    suffix='.html',
+)
 #---------------------------------------------------------
 # 3. DATABASE MODELS
 # ---------------------------------------------------------
@@ -67,8 +163,10 @@ class User(UserMixin, db.Model):
     has_paid = db.Column(db.Boolean, default=False)
 
 class Payment(db.Model):
+    # (status, id) لطابور الأدمن: فلترة Pending + keyset pagination بالـ id من نفس الـ index
+    __table_args__ = (db.Index('ix_payment_status_id', 'status', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     status = db.Column(db.String(20), default='Pending')
     user = db.relationship('User', backref='payments')
 
@@ -76,199 +174,87 @@ class PreApproved(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.String(50), unique=True, nullable=False)
 
+# بيانات المستخدم اللي كل request محتاجها (id, student_id, is_admin, has_paid) بتتكاش
+# USER_CACHE_TTL ثانية بدل query مع كل صفحة. أي commit بيغير User بيمسحه من الكاش فورًا،
+# والـ TTL القصير بس عشان الـ instances التانية (Vercel) اللي مش شايفة الـ commit ده
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '30'))
+user_cache = TTLCache(max_entries=int(os.environ.get('USER_CACHE_SIZE', '4096')), ttl=USER_CACHE_TTL)
+
+class UserPrincipal(UserMixin):
+    def __init__(self, user):
+        self.id = user.id
+        self.student_id = user.student_id
+        self.is_admin = bool(user.is_admin)
+        self.has_paid = bool(user.has_paid)
+
+def invalidate_user_principal(user_id):
+    user_cache.discard(user_id)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def queue_principal_invalidation(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_committed_principals(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate_user_principal(user_id)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def forget_rolled_back_principals(session, previous_transaction):
+    session.info.pop('changed_user_ids', None)
+
+def create_tables():
+    # create_all مبيضيفش indexes لجدول موجود قبل كده، فبنكريت الناقص منها لوحده
+    db.create_all()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    user_id = int(user_id)
+    principal = user_cache.get(user_id)
+    if principal is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        principal = UserPrincipal(user)
+        user_cache.put(user_id, principal)
+    return principal
+
+# الـ KDF (scrypt/pbkdf2) أتقل حاجة في login/register: بيتحسب في pool من الـ processes
+# بعدد محدود، والباسوردات المتخزنة بـ parameters قديمة بتتحدث وقت الـ login
+password_hasher = PasswordHasher(
+    method=os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+    salt_length=int(os.environ.get('PASSWORD_SALT_LENGTH', '16')),
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', default_workers())),
+    max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '0')) or None,  # default: passwords.DEFAULT_MAX_PENDING
+    wait_timeout=float(os.environ.get('PASSWORD_HASH_WAIT', '10')),
+)
+
+def upgrade_password_hash(user, password):
+    # شرط password القديم: لو الأدمن عمل reset في نفس اللحظة منكتبش فوقه
+    try:
+        new_hash = password_hasher.hash(password)
+        db.session.execute(update(User).where(User.id == user.id, User.password == user.password)
+                           .values(password=new_hash), execution_options={'synchronize_session': False})
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Password Rehash Error: {e}")
 # ---------------------------------------------------------
 # 4. TEMPLATES (MERGED ORIGINAL DESIGN + AUTH)
 # ---------------------------------------------------------
 
 # تصميم احترافي جديد (CSS Pro)
 auth_style = """
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Cairo:wght@400;600;700&display=swap');
-
-    * { box-sizing: border-box; margin: 0; padding: 0; }
-    
-    body { 
-        font-family: 'Cairo', sans-serif; 
-        background-color: #f0f2f5; 
-        background-image: url('https://i.ibb.co/zHRhsP6j/bg.jpg'); /* نفس خلفيتك */
-        background-size: cover; 
-        background-position: center; 
-        background-attachment: fixed;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        min-height: 100vh;
-        direction: ltr; /* الحقول انجليزي فالافضل الاتجاه يسار */
-    }
-    
-    /* طبقة تغميق الخلفية عشان الكلام يبان */
-    body::before {
-        content: '';
-        position: absolute;
-        top: 0; left: 0; width: 100%; height: 100%;
-        background: rgba(0, 0, 0, 0.05);
-        backdrop-filter: blur(3px);
-        z-index: -1;
-    }
-
-    .auth-box { 
-        background: rgba(255, 255, 255, 0.95); 
-        width: 100%;
-        max-width: 420px; 
-        padding: 40px 30px; 
-        border-radius: 20px; 
-        box-shadow: 0 15px 35px rgba(0,0,0,0.15); 
-        text-align: center;
-        transition: transform 0.3s ease;
-        margin: 20px; /* مسافة من الحواف في الموبايل */
-    }
-
-    /* تأثير الهوف على الكارت */
-    .auth-box:hover {
-        transform: translateY(-5px);
-    }
-
-    h2 { 
-        color: #2d3748; 
-        margin-bottom: 30px; 
-        font-weight: 700; 
-        font-size: 28px;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        letter-spacing: 1px;
-    }
-
-    /* تنسيق حقول الإدخال مع الأيقونات */
-    .input-group {
-        position: relative;
-        margin-bottom: 20px;
-    }
-
-    .input-group input { 
-        width: 100%; 
-        padding: 15px 15px 15px 45px; /* مسافة للأيقونة */
-        border: 2px solid #e2e8f0; 
-        border-radius: 12px; 
-        font-size: 16px; 
-        outline: none; 
-        transition: all 0.3s ease;
-        background: #f8fafc;
-        color: #4a5568;
-        font-family: 'Cairo', sans-serif;
-    }
-
-    .input-group i {
-        position: absolute;
-        left: 15px;
-        top: 50%;
-        transform: translateY(-50%);
-        color: #a0aec0;
-        font-size: 18px;
-        transition: color 0.3s ease;
-    }
-
-    /* لما تضغط جوه الخانة */
-    .input-group input:focus { 
-        border-color: #667eea; 
-        background: #fff;
-        box-shadow: 0 0 0 4px rgba(102, 126, 234, 0.1);
-    }
-
-    .input-group input:focus + i {
-        color: #667eea;
-    }
-
-    button { 
-        width: 100%; 
-        padding: 15px; 
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-        color: white; 
-        border: none; 
-        border-radius: 12px; 
-        font-size: 18px; 
-        cursor: pointer; 
-        font-weight: 600; 
-        margin-top: 10px; 
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.35);
-    }
-
-    button:hover { 
-        opacity: 0.95; 
-        transform: translateY(-2px); 
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.45);
-    }
-
-    button:active {
-        transform: translateY(0);
-    }
-
-    .flash { 
-        padding: 12px; 
-        border-radius: 10px; 
-        margin-bottom: 20px; 
-        color: white; 
-        font-weight: 600; 
-        font-size: 14px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        gap: 8px;
-    }
-    .error { background: #ff6b6b; box-shadow: 0 4px 15px rgba(255, 107, 107, 0.3); }
-    .success { background: #4caf50; box-shadow: 0 4px 15px rgba(76, 175, 80, 0.3); }
-
-    .links {
-        margin-top: 25px;
-        font-size: 15px;
-        color: #718096;
-    }
-
-    a { 
-        color: #667eea; 
-        text-decoration: none; 
-        font-weight: 700; 
-        transition: color 0.2s;
-    }
-    a:hover { color: #764ba2; text-decoration: underline; }
-
-    .telegram-btn { 
-        background: #229ED9; 
-        display: flex; 
-        align-items: center; 
-        justify-content: center; 
-        gap: 10px; 
-        text-decoration: none; 
-        padding: 12px; 
-        color: white; 
-        border-radius: 12px; 
-        font-weight: bold; 
-        margin-top: 15px; 
-        transition: 0.3s; 
-        box-shadow: 0 4px 10px rgba(34, 158, 217, 0.3);
-    }
-    .telegram-btn:hover { 
-        background: #1b7fb0; 
-        transform: translateY(-2px); 
-        color: white; 
-        text-decoration: none;
-    }
-
-    /* تحسينات للموبايل */
-    @media (max-width: 480px) {
-        .auth-box {
-            padding: 30px 20px;
-            width: 90%;
-        }
-        h2 { font-size: 24px; }
-        input, button { font-size: 16px; }
-    }
-</style>
-<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
+{% for href, kind in asset_preloads() %}<link rel="preload" href="{{ href }}" as="{{ kind }}"{% if kind == 'font' %} type="font/woff2" crossorigin{% endif %}>
+{% endfor %}<link rel="stylesheet" href="{{ vendor_url('cairo') }}">
+<link rel="stylesheet" href="{{ asset_url('css/auth.css') }}">
+<link rel="stylesheet" href="{{ vendor_url('fontawesome') }}">
 """
 
 login_html = f"""<!doctype html>
@@ -362,43 +348,7 @@ payment_html = f"""<!doctype html>
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Activation - AFM 27</title>
     {auth_style}
-    <style>
-        /* ستايل خاص بكارت فودافون كاش */
-        .vf-card {{
-            background: linear-gradient(135deg, #e53935 0%, #c62828 100%);
-            color: white;
-            padding: 25px;
-            border-radius: 16px;
-            margin-bottom: 30px;
-            box-shadow: 0 10px 25px rgba(229, 57, 53, 0.3);
-            position: relative;
-            overflow: hidden;
-            text-align: left;
-        }}
-        
-        /* لمعة جمالية على الكارت */
-        .vf-card::after {{
-            content: '';
-            position: absolute;
-            top: -50%; left: -50%; width: 200%; height: 200%;
-            background: rgba(255,255,255,0.1);
-            transform: rotate(30deg);
-            pointer-events: none;
-        }}
-
-        .vf-title {{ font-size: 14px; opacity: 0.9; margin-bottom: 5px; display: flex; align-items: center; gap: 8px; }}
-        .vf-number {{ font-size: 26px; font-weight: 700; letter-spacing: 2px; text-shadow: 1px 1px 2px rgba(0,0,0,0.2); font-family: 'Courier New', monospace; }}
-        
-        .divider {{
-            display: flex; align-items: center; text-align: center; color: #a0aec0; margin: 25px 0;
-        }}
-        .divider::before, .divider::after {{
-            content: ''; flex: 1; border-bottom: 1px solid #e2e8f0;
-        }}
-        .divider span {{ padding: 0 15px; font-size: 14px; font-weight: 600; }}
-
-        .helper-text {{ text-align: left; font-size: 14px; color: #4a5568; margin-bottom: 8px; font-weight: 600; }}
-    </style>
+    <link rel="stylesheet" href="{{{{ asset_url('css/payment.css') }}}}">
 </head>
 <body>
 <div class="auth-box">
@@ -462,6 +412,14 @@ admin_html = """
             <button type="submit" class="btn approve">Add to Whitelist</button>
         </form>
 
+        <form method="POST" action="/admin/preapprove/bulk" enctype="multipart/form-data">
+            <h3>📥 Bulk Pre-Approve</h3>
+            <p style="margin:5px 0; font-size:14px; color:#555;">Paste IDs (one per line, or separated by commas/spaces) or upload a CSV. Registered students are activated, the rest are whitelisted.</p>
+            <textarea name="student_ids" rows="4" placeholder="Student IDs" style="padding:8px; width:95%;"></textarea>
+            <p style="margin:5px 0;"><input type="file" name="file" accept=".csv,.txt"></p>
+            <button type="submit" class="btn approve">Pre-Approve All</button>
+        </form>
+
         <form method="POST" action="/admin/reset_password" style="background:#fff3e0; border-left: 5px solid #ff9800;">
             <h3>🔑 Reset Password</h3>
             <p style="margin:5px 0; font-size:14px; color:#555;">Enter ID to reset their password to <strong>123456</strong></p>
@@ -469,7 +427,7 @@ admin_html = """
             <button type="submit" class="btn" style="background:#ff9800;">Reset to 123456</button>
         </form>
 
-        <h3>📋 Pending Requests</h3>
+        <h3>📋 Pending Requests ({{ pending_count }})</h3>
         {% if requests %}
         <table>
             <tr><th>Student ID</th><th>Status</th><th>Action</th></tr>
@@ -481,6 +439,10 @@ admin_html = """
             </tr>
             {% endfor %}
         </table>
+        <p>
+            {% if after is not none %}<a href="/admin" class="btn" style="background:#607d8b;">« First page</a>{% endif %}
+            {% if next_after is not none %}<a href="/admin?after={{ next_after }}" class="btn" style="background:#2196f3;">Next page ›</a>{% endif %}
+        </p>
         {% else %}
             <p>No pending requests.</p>
         {% endif %}
@@ -488,6 +450,29 @@ admin_html = """
 </body>
 </html>
 """
+admin_bulk_html = """
+<!doctype html>
+<html>
+<head><title>Bulk Pre-Approve</title><style>body{font-family:'Arial';padding:20px;background:#f0f4f8}.container{max-width:1000px;margin:auto;background:white;padding:20px;border-radius:10px;box-shadow:0 4px 15px rgba(0,0,0,0.1)}table{width:100%;border-collapse:collapse;margin-top:20px}th,td{padding:8px;border-bottom:1px solid #ddd;text-align:center}th{background:#333;color:white}.btn{padding:8px 15px;color:white;text-decoration:none;border-radius:5px;background:#2196f3}.invalid,.duplicate{color:#c62828}.activated,.preapproved{color:green}</style></head>
+<body>
+    <div class="container">
+        <h1 style="display:inline-block">📥 Bulk Pre-Approve</h1>
+        <a href="/admin" class="btn" style="float:right;">« Admin Panel</a>
+        <p>{{ results|length }} IDs in {{ '%.0f'|format(elapsed_ms) }} ms, {{ payments_approved }} pending payments approved.</p>
+        <table>
+            <tr>{% for outcome, n in counts.items() %}<th>{{ outcome }}</th>{% endfor %}</tr>
+            <tr>{% for outcome, n in counts.items() %}<td>{{ n }}</td>{% endfor %}</tr>
+        </table>
+        <table>
+            <tr><th>Student ID</th><th>Outcome</th></tr>
+            {% for student_id, outcome in results %}
+            <tr><td>{{ student_id }}</td><td class="{{ outcome }}">{{ outcome }}</td></tr>
+            {% endfor %}
+        </table>
+    </div>
+</body>
+</html>
+"""
 # ---------------------------------------------------------
 # 5. MAIN TEMPLATE (ORIGINAL STYLE & CHARTS RESTORED)
 # ---------------------------------------------------------
@@ -498,223 +483,7 @@ html_template = """
     <meta charset="UTF-8">
     <title>AFM 27 RESULTS</title>
     <link rel="icon" type="image/png" href="{{ url_for('static', filename='logoTB.png') }}">
-    <style>
-        body {
-            font-family: 'Arial', sans-serif;
-            background-color: #f0f4f8;
-            text-align: center;
-            position: relative;
-        }
-        body::before {
-            content: "";
-            background-image: url('https://i.ibb.co/zHRhsP6j');
-            background-size: cover;
-            background-position: center;
-            opacity: 0.1;
-            top: 0;
-            left: 0;
-            bottom: 0;
-            right: 0;
-            position: fixed;
-            z-index: -1;
-        }
-        .container {
-            margin: 60px auto;
-            width: 70%;
-            background-color: rgba(255, 255, 255, 0.9);
-            padding: 20px 30px;
-            border-radius: 10px;
-            box-shadow: 0 0 15px rgba(0,0,0,0.1);
-        }
-        .header {
-            display: flex;
-            align-items: center;
-            justify-content: space-between;
-            margin-bottom: 30px;
-            direction: ltr;
-        }
-        .header-content { display: flex; align-items: center; gap: 20px; }
-        .header img {
-            height: 70px;
-            width: auto;
-            opacity: 0.85;
-        }
-        .header-text {
-            text-align: left;
-            direction: ltr;
-        }
-        .header-text h1 {
-            font-size: 36px;
-            margin: 0;
-            font-weight: 900;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-            letter-spacing: 1px;
-            font-family: 'Arial Black', sans-serif;
-        }
-        .header-text h1 a {
-            text-decoration: none;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-        }
-        .header-text p {
-            font-size: 18px;
-            margin: 5px 0 0 0;
-            font-style: italic;
-            font-weight: bold;
-            background: linear-gradient(45deg, #ff6b6b, #4ecdc4);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            text-shadow: 1px 1px 2px rgba(0,0,0,0.1);
-        }
-        .header-text p a {
-            text-decoration: none;
-            font-style: italic;
-            font-weight: bold;
-            background: linear-gradient(45deg, #ff6b6b, #4ecdc4);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-        }
-        
-        .logout-btn {
-            background: #f44336; color: white; padding: 10px 20px; border-radius: 20px; text-decoration: none; font-weight: bold; font-size: 14px; box-shadow: 0 4px 10px rgba(0,0,0,0.2); transition:0.3s;
-        }
-        .logout-btn:hover { background: #d32f2f; transform: translateY(-2px); }
-
-        /* Navigation Buttons */
-        .nav-buttons {
-            display: flex;
-            justify-content: center;
-            gap: 20px;
-            margin: 30px 0;
-            flex-wrap: wrap;
-        }
-        
-        .nav-btn {
-            padding: 15px 30px;
-            font-size: 18px;
-            font-weight: bold;
-            border: none;
-            border-radius: 25px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            text-decoration: none;
-            color: white;
-            box-shadow: 0 4px 15px rgba(0,0,0,0.2);
-        }
-        
-        .nav-btn.search { background: linear-gradient(45deg, #4285f4, #34a853); }
-        .nav-btn.distance { background: linear-gradient(45deg, #ff6b6b, #4ecdc4); }
-        .nav-btn.need { background: linear-gradient(45deg, #9c27b0, #e91e63); }
-        .nav-btn.residency { background: linear-gradient(45deg, #f39c12, #e74c3c); }
-        .nav-btn.admin { background: #333; }
-        .nav-btn.active { background: linear-gradient(45deg, #333, #555); }
-        .nav-btn:hover { transform: translateY(-3px); box-shadow: 0 6px 20px rgba(0,0,0,0.3); }
-        
-        table {
-            border-collapse: collapse;
-            margin: auto;
-            width: 100%;
-            font-size: 18px;
-            direction: rtl;
-            background-color: #fff;
-        }
-        th, td {
-            border: 1px solid #ccc;
-            padding: 10px;
-            text-align: center;
-        }
-        th { width: 40%; }
-        td { width: 60%; font-weight: bold; }
-        .title {
-            font-weight: bold;
-            font-size: 20px;
-            background-color: #b3e5fc;
-            color: #000;
-        }
-        .footer { background-color: #a0d080; font-style: italic; }
-        .first-year { background-color: #e0f7fa; }
-        .second-year { background-color: #fff3e0; }
-        .third-year { background-color: #ede7f6; }
-        .fourth-year { background-color: #d0e0ff; }
-        .totals { background-color: #d0f8ce; }
-        .rank { background-color: #ffe0f0; }
-        
-        form { margin: 0 auto; display: flex; flex-direction: column; align-items: center; }
-        label.title {
-            font-size: 36px;
-            font-weight: 800;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            margin-bottom: 25px;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-            letter-spacing: 2px;
-            text-transform: uppercase;
-            font-family: 'Arial Black', sans-serif;
-        }
-        
-        .search-container { position: relative; margin: 20px 0; }
-        input[type="text"], input[type="number"] {
-            font-size: 24px; padding: 15px 25px; width: 400px; border: 2px solid #ddd; border-radius: 25px; transition: all 0.3s ease; outline: none; box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        }
-        input[type="text"]:focus, input[type="number"]:focus { border-color: #4285f4; box-shadow: 0 0 15px rgba(66, 133, 244, 0.3); transform: scale(1.02); }
-        input[type="submit"] {
-            font-size: 20px; padding: 12px 30px; margin-top: 15px; border-radius: 25px; background: linear-gradient(45deg, #4285f4, #34a853); color: white; border: none; cursor: pointer; transition: all 0.3s ease; box-shadow: 0 4px 15px rgba(66, 133, 244, 0.3);
-        }
-        input[type="submit"]:hover { transform: translateY(-2px); box-shadow: 0 6px 20px rgba(66, 133, 244, 0.4); }
-        
-        p { font-size: 22px; color: red; }
-        
-        .distance-result {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; border-radius: 20px; margin: 30px 0; box-shadow: 0 8px 25px rgba(0,0,0,0.3);
-        }
-        .distance-result h2 { font-size: 32px; margin-bottom: 20px; text-shadow: 2px 2px 4px rgba(0,0,0,0.3); }
-        
-        .progress-arrow-container { display: flex; align-items: center; justify-content: center; margin: 30px 0; position: relative; direction: ltr; }
-        .progress-circle { width: 140px; height: 140px; border-radius: 50%; display: flex; flex-direction: column; align-items: center; justify-content: center; color: white; font-weight: bold; text-shadow: 2px 2px 4px rgba(0,0,0,0.5); position: relative; z-index: 2; }
-        .current-circle { background: linear-gradient(135deg, #ff6b6b, #ee5a52); box-shadow: 0 8px 20px rgba(255, 107, 107, 0.4); }
-        .target-circle { background: linear-gradient(135deg, #4ecdc4, #44a08d); box-shadow: 0 8px 20px rgba(78, 205, 196, 0.4); }
-        .circle-label { font-size: 16px; margin-bottom: 5px; opacity: 0.9; }
-        .circle-value { font-size: 26px; font-weight: 900; }
-        .progress-arrow { flex: 0 0 200px; height: 12px; background: linear-gradient(90deg, #ff6b6b, #4ecdc4); margin: 0 25px; border-radius: 6px; position: relative; box-shadow: 0 4px 15px rgba(0,0,0,0.2); }
-        .progress-arrow::after { content: ''; position: absolute; right: -18px; top: 50%; transform: translateY(-50%); width: 0; height: 0; border-left: 22px solid #4ecdc4; border-top: 20px solid transparent; border-bottom: 20px solid transparent; filter: drop-shadow(2px 2px 4px rgba(0,0,0,0.3)); }
-        .progress-difference { position: absolute; top: -50px; left: 50%; transform: translateX(-50%); background: rgba(255,255,255,0.95); color: #333; padding: 12px 20px; border-radius: 25px; font-size: 18px; font-weight: bold; box-shadow: 0 4px 15px rgba(0,0,0,0.2); z-index: 3; white-space: nowrap; min-width: 120px; text-align: center; }
-        .progress-difference.positive { background: linear-gradient(135deg, #4CAF50, #45a049); color: white; }
-        .progress-difference.negative { background: linear-gradient(135deg, #f44336, #e53935); color: white; }
-        .progress-difference.neutral { background: linear-gradient(135deg, #2196F3, #1976D2); color: white; }
-        
-        .motivational-message {
-            background: linear-gradient(45deg, #ff6b6b, #4ecdc4); color: white; padding: 25px; border-radius: 15px; margin: 20px 0; font-size: 28px; font-weight: bold; text-shadow: 1px 1px 2px rgba(0,0,0,0.3); line-height: 1.4;
-        }
-        .motivational-message .highlight-number { font-size: 36px; text-decoration: underline; font-weight: 900; }
-        
-        .chart-title {
-            font-size: 26px; font-weight: bold; color: #2c3e50; margin: 30px 0 20px 0; padding: 15px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; border-radius: 15px; box-shadow: 0 4px 15px rgba(0,0,0,0.2); text-shadow: 1px 1px 2px rgba(0,0,0,0.3);
-        }
-        
-        .percentile-box {
-            background: linear-gradient(45deg, #ff6b6b, #4ecdc4, #45b7d1, #96ceb4); background-size: 400% 400%; animation: gradientShift 3s ease infinite; color: white; font-size: 22px; font-weight: bold; padding: 20px; margin: 20px auto; border-radius: 20px; box-shadow: 0 8px 25px rgba(0,0,0,0.3); text-shadow: 2px 2px 4px rgba(0,0,0,0.5); border: 3px solid white; max-width: 500px; position: relative; overflow: hidden;
-        }
-        .percentile-box::before { content: ''; position: absolute; top: -50%; left: -50%; width: 200%; height: 200%; background: linear-gradient(45deg, transparent, rgba(255,255,255,0.1), transparent); transform: rotate(45deg); animation: shine 2s infinite; }
-        @keyframes gradientShift { 0% { background-position: 0% 50%; } 50% { background-position: 100% 50%; } 100% { background-position: 0% 50%; } }
-        @keyframes shine { 0% { transform: translateX(-100%) translateY(-100%) rotate(45deg); } 100% { transform: translateX(100%) translateY(100%) rotate(45deg); } }
-        
-        .free-palestine {
-            margin-top: 40px; padding: 25px; font-size: 24px; font-weight: bold; color: white; background: linear-gradient(90deg, black 25%, white 25% 50%, green 50% 75%, red 75% 100%); border-radius: 12px; text-shadow: 1px 1px 2px #000;
-        }
-        .dual-input { display: flex; gap: 20px; align-items: center; flex-wrap: wrap; justify-content: center; direction: ltr; }
-        .dual-input input { width: 180px; }
-        .dual-input label { font-size: 18px; font-weight: bold; color: #333; margin-bottom: 5px; display: block; }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/main.css') }}">
     <script>
       window.va = window.va || function () { (window.vaq = window.vaq || []).push(arguments); };
     </script>
@@ -724,7 +493,7 @@ html_template = """
     <div class="container">
         <div class="header">
             <div class="header-content">
-                <img src="https://i.postimg.cc/0rHzBdbx/8.jpg" alt="Logo">
+                <img src="{{ vendor_url('logo') }}" alt="Logo">
                 <div class="header-text">
                     <h1><a href="/">AFM 27 Results & Analysis</a></h1>
                     <p><a href="https://t.me/Abdo_Hamdi6" target="_blank">By : Abdo Hamdy Aly</a></p>
@@ -805,6 +574,60 @@ html_template = """
         </div>
         {% endif %}
 
+        {% if need_curve %}
+        <div class="distance-result">
+            <h2>📈 What-If Curve (Every Target)</h2>
+            <div class="dual-input" style="flex-direction: column;">
+                <label style="color: white;">Target Total: <span id="curve-target"></span></label>
+                <input type="range" id="curve-slider" min="0" max="0" step="1" value="0" style="width: 80%;">
+            </div>
+            <div class="motivational-message" id="curve-output"></div>
+            <table style="color: #333;">
+                <thead><tr><th class="title">🎯 TARGET %</th><th class="title">📝 MARKS NEEDED</th><th class="title">📊 % OF REMAINING</th><th class="title">🏅 PROJECTED RANK</th></tr></thead>
+                <tbody id="curve-table"></tbody>
+            </table>
+        </div>
+        <script type="application/json" id="need-curve-data">{{ need_curve|safe }}</script>
+        <script>
+            // المنحنى كله جاي في الصفحة مرة واحدة، السلايدر والجدول بيترسموا هنا من غير أي POST
+            (function () {
+                const curve = JSON.parse(document.getElementById('need-curve-data').textContent);
+                const points = curve.points;
+                const slider = document.getElementById('curve-slider');
+                const output = document.getElementById('curve-output');
+                const label = document.getElementById('curve-target');
+                if (!points.length) {
+                    output.textContent = 'You are already at 100% 🎉';
+                    slider.style.display = 'none';
+                    return;
+                }
+                function describe(p) {
+                    if (p[2] > 100) return 'Impossible (>100%) for ' + p[0] + '%';
+                    return 'You need <span class="highlight-number">' + p[1] + '</span> marks out of 1695 (' + p[2] +
+                        '% of the remaining total)<br>Projected rank: <span class="highlight-number">#' + p[3] + '</span>';
+                }
+                function show(i) {
+                    label.textContent = points[i][0] + '%';
+                    output.innerHTML = describe(points[i]);
+                }
+                const tbody = document.getElementById('curve-table');
+                points.forEach(function (p) {
+                    const tr = document.createElement('tr');
+                    tr.className = p[2] > 100 ? 'rank' : 'totals';
+                    [p[0] + '%', p[1], p[2] > 100 ? 'Impossible' : p[2] + '%', '#' + p[3]].forEach(function (v) {
+                        const td = document.createElement('td');
+                        td.textContent = v;
+                        tr.appendChild(td);
+                    });
+                    tbody.appendChild(tr);
+                });
+                slider.max = points.length - 1;
+                slider.addEventListener('input', function () { show(+slider.value); });
+                show(0);
+            })();
+        </script>
+        {% endif %}
+
         {% elif mode == 'distance' %}
         <form method="POST" action="/?mode=distance">
             <label class="title">HOW FAR I AM</label><br>
@@ -865,6 +688,18 @@ html_template = """
                     <br><br>You're doing great! Keep it up! 🔥
                 </div>
             {% endif %}
+
+            {% if distance_result['milestones'] %}
+            <table style="color:#333;">
+                <tr><th class="title">🏁 RANK</th><th class="title">📏 MARKS</th></tr>
+                {% for m_rank, m_points in distance_result['milestones'] %}
+                <tr class="{{ 'totals' if m_points <= 0 else 'rank' }}">
+                    <td>#{{ m_rank }}</td>
+                    <td>{% if m_points > 0 %}{{ m_points }} Behind{% elif m_points == 0 %}At Rank{% else %}{{ m_points|abs }} Ahead{% endif %}</td>
+                </tr>
+                {% endfor %}
+            </table>
+            {% endif %}
         </div>
         {% endif %}
 
@@ -891,14 +726,14 @@ html_template = """
                     {% else %}
                         {% set css_class = '' %}
                     {% endif %}
-                    <tr class="{{ css_class }}"><td>{{ value }}</td><td>{{ key }}</td></tr>
+                    <tr class="{{ css_class }}"><td>{{ value }}{% if key in percentiles %} <span style="font-size:13px; font-weight:normal; color:#555;">({{ '%.1f'|format(percentiles[key]) }}th pct)</span>{% endif %}</td><td>{{ key }}</td></tr>
                 {% endif %}
             {% endfor %}
             <tr class="footer"><td colspan="2">💻 Designed and Coded By : Abdo Hamdy Aly</td></tr>
             <tr>
                 <td colspan="2" style="text-align: center; font-size: 18px; padding: 15px;">
                     <a href="https://t.me/Abdo_Hamdi6" target="_blank" style="text-decoration: none; color: black;">
-                        <img src="https://upload.wikimedia.org/wikipedia/commons/8/82/Telegram_logo.svg" alt="Telegram" style="width: 24px; vertical-align: middle; margin-left: 8px;">
+                        <img src="{{ vendor_url('telegram') }}" alt="Telegram" style="width: 24px; vertical-align: middle; margin-left: 8px;">
                         📱 @Abdo_Hamdi6
                     </a>
                 </td>
@@ -907,7 +742,7 @@ html_template = """
 
         {% if plot_url %}
             <div class="chart-title">📈 Student Score Distribution</div>
-            <img src="data:image/png;base64,{{ plot_url }}">
+            <img src="{{ plot_url }}" width="800" height="500" alt="Score Distribution">
             {% if percentile %}
                 <div class="percentile-box">
                     🎯 YOU ARE IN THE {{ percentile }}th PERCENTILE! 🏆
@@ -917,7 +752,7 @@ html_template = """
 
         {% if rank_progress_url %}
             <div class="chart-title">📊 Cumulative Rank Progress</div>
-            <img src="data:image/png;base64,{{ rank_progress_url }}">
+            <img src="{{ rank_progress_url }}" width="800" height="500" alt="Rank Progress">
         {% endif %}
 
         {% else %}
@@ -937,29 +772,7 @@ residency_template = """
     <meta charset="UTF-8">
     <title>Residency Matching Results</title>
     <link rel="icon" type="image/png" href="{{ url_for('static', filename='logoTB.png') }}">
-    <style>
-        body { font-family: 'Arial', sans-serif; background-color: #f0f4f8; text-align: center; position: relative; }
-        body::before { content: ""; background-image: url('https://i.ibb.co/zHRhsP6j'); background-size: cover; background-position: center; opacity: 0.1; top: 0; left: 0; bottom: 0; right: 0; position: fixed; z-index: -1; }
-        .container { margin: 60px auto; width: 90%; max-width: 1400px; background-color: rgba(255, 255, 255, 0.9); padding: 20px 30px; border-radius: 10px; box-shadow: 0 0 15px rgba(0,0,0,0.1); }
-        .nav-buttons { display: flex; justify-content: center; gap: 20px; margin: 30px 0; flex-wrap: wrap; }
-        .nav-btn { padding: 15px 30px; font-size: 18px; font-weight: bold; border: none; border-radius: 25px; cursor: pointer; text-decoration: none; color: white; box-shadow: 0 4px 15px rgba(0,0,0,0.2); }
-        .nav-btn.home { background: linear-gradient(45deg, #667eea, #764ba2); }
-        .nav-btn.year-2024 { background: linear-gradient(45deg, #ff6b6b, #ee5a52); }
-        .nav-btn.year-2025 { background: linear-gradient(45deg, #4ecdc4, #44a08d); }
-        .nav-btn.active { background: linear-gradient(45deg, #333, #555); }
-        .stats-container { display: flex; justify-content: center; gap: 30px; margin: 30px 0; flex-wrap: wrap; }
-        .stat-box { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 20px 40px; border-radius: 15px; box-shadow: 0 4px 15px rgba(0,0,0,0.2); }
-        .stat-number { font-size: 36px; font-weight: bold; margin: 10px 0; }
-        .stat-label { font-size: 16px; opacity: 0.9; }
-        .table-container { overflow-x: auto; margin: 30px 0; }
-        table { border-collapse: collapse; margin: 0 auto; width: 100%; font-size: 16px; direction: rtl; background-color: #fff; box-shadow: 0 4px 15px rgba(0,0,0,0.1); border-radius: 10px; overflow: hidden; }
-        th { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 15px 10px; }
-        td { padding: 12px 10px; border: 1px solid #ddd; }
-        .boast-yes { background-color: #c8e6c9 !important; font-weight: bold; }
-        .boast-no { background-color: #ffe0b2 !important; }
-        .search-box { margin: 20px 0; padding: 15px; background: rgba(255,255,255,0.5); border-radius: 10px; }
-        .search-box input { font-size: 18px; padding: 10px 20px; width: 300px; border: 2px solid #ddd; border-radius: 25px; outline: none; }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/residency.css') }}">
     <script>
         function filterTable() {
             const input = document.getElementById('searchInput');
@@ -984,19 +797,51 @@ residency_template = """
         <h1>🏥 Residency Matching {{ year }}</h1>
         <div class="nav-buttons">
             <a href="/" class="nav-btn home">🏠 Home</a>
-            <a href="/residency?year=2024" class="nav-btn year-2024 {{ 'active' if year == '2024' else '' }}">2024</a>
-            <a href="/residency?year=2025" class="nav-btn year-2025 {{ 'active' if year == '2025' else '' }}">2025</a>
+            {% for y in years %}
+            <a href="/residency?year={{ y }}" class="nav-btn year-{{ y }} {{ 'active' if year == y else '' }}">{{ y }}</a>
+            {% endfor %}
         </div>
         
         {% if df_empty %}
             <p style="color:red; font-size:22px;">⚠️ No data available</p>
         {% else %}
             <div class="stats-container">
-                <div class="stat-box"><div class="stat-label">Total</div><div class="stat-number">{{ results|length }}</div></div>
+                <div class="stat-box"><div class="stat-label">Total</div><div class="stat-number">{{ total_count }}</div></div>
                 <div class="stat-box" style="background:#4ecdc4"><div class="stat-label">With Post</div><div class="stat-number">{{ boast_count }}</div></div>
                 <div class="stat-box" style="background:#ff6b6b"><div class="stat-label">Without Post</div><div class="stat-number">{{ no_boast_count }}</div></div>
+                {% if filtered %}<div class="stat-box" style="background:#333"><div class="stat-label">Matching</div><div class="stat-number">{{ match_count }}</div></div>{% endif %}
+            </div>
+            <div class="search-box">
+                <form method="GET" action="/residency" class="filter-form">
+                    <input type="hidden" name="year" value="{{ year }}">
+                    <select name="specialty">
+                        <option value="">All specialties</option>
+                        {% for st in specialty_stats %}<option value="{{ st.specialty }}" {{ 'selected' if st.specialty == specialty else '' }}>{{ st.specialty }}</option>{% endfor %}
+                    </select>
+                    <select name="status">
+                        <option value="">All statuses</option>
+                        {% for s in statuses %}<option value="{{ s }}" {{ 'selected' if s == status else '' }}>{{ s }}</option>{% endfor %}
+                    </select>
+                    <input type="number" name="rank_min" min="1" placeholder="Rank from" value="{{ rank_min if rank_min is not none else '' }}">
+                    <input type="number" name="rank_max" min="1" placeholder="Rank to" value="{{ rank_max if rank_max is not none else '' }}">
+                    <input type="hidden" name="per_page" value="{{ per_page }}">
+                    <button type="submit">Filter</button>
+                </form>
             </div>
-            <div class="search-box"><input type="text" id="searchInput" onkeyup="filterTable()" placeholder="🔍 Search..."></div>
+            <details>
+                <summary>📊 Specialties ({{ specialty_stats|length }})</summary>
+                <div class="table-container">
+                    <table>
+                        <thead><tr><th>RESIDENCY</th><th>Total</th><th>With Post</th><th>Without Post</th><th>Best Rank</th><th>Last Rank</th></tr></thead>
+                        <tbody>
+                            {% for st in specialty_stats %}
+                            <tr><td><a href="/residency?year={{ year }}&specialty={{ st.specialty|urlencode }}">{{ st.specialty }}</a></td><td>{{ st.count }}</td><td>{{ st.post }}</td><td>{{ st.no_post }}</td><td>{{ st.min_rank if st.min_rank is not none else '-' }}</td><td>{{ st.max_rank if st.max_rank is not none else '-' }}</td></tr>
+                            {% endfor %}
+                        </tbody>
+                    </table>
+                </div>
+            </details>
+            <div class="search-box"><input type="text" id="searchInput" onkeyup="filterTable()" placeholder="🔍 Search this page..."></div>
             <div class="table-container">
                 <table id="residencyTable">
                     <thead><tr><th>RANK</th><th>RESIDENCY</th><th>STATUS</th></tr></thead>
@@ -1009,16 +854,129 @@ residency_template = """
                     </tbody>
                 </table>
             </div>
+            {% if page_count > 1 %}
+            <div class="pager">
+                {% if page > 1 %}<a href="{{ page_url(page - 1) }}">‹ Previous</a>{% endif %}
+                <span>Page {{ page }} / {{ page_count }}</span>
+                {% if page < page_count %}<a href="{{ page_url(page + 1) }}">Next ›</a>{% endif %}
+            </div>
+            {% endif %}
         {% endif %}
     </div>
 </body>
 </html>
 """
 
+# القوالب بتتسجل مرة واحدة في DictLoader: Jinja بيكومبايل كل قالب أول مرة بس
+# ويفضل يستخدمه من الكاش، بدل from_string اللي كان بيعيد الكومبايل مع كل request
+TEMPLATES = {
+    'login.html': login_html,
+    'register.html': register_html,
+    'payment.html': payment_html,
+    'admin.html': admin_html,
+    'admin_bulk.html': admin_bulk_html,
+    'main.html': html_template,
+    'residency.html': residency_template,
+}
+app.jinja_loader = ChoiceLoader([DictLoader(TEMPLATES)] + ([app.jinja_loader] if app.jinja_loader else []))
+
+# الـ CSS والخطوط والصور من static/dist بأسماء فيها hash المحتوى (flask build-assets)،
+# فبتتكاش سنة كاملة immutable. لو مفيش build بنرجع لـ static/css والـ CDN زي الأول
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+asset_manifest = assets.AssetManifest(app.static_folder)
+
+@app.template_global()
+def asset_url(path):
+    return url_for('static', filename=asset_manifest.path_for(path))
+
+@app.template_global()
+def vendor_url(name):
+    built = asset_manifest.vendor(name)
+    return url_for('static', filename=built) if built else assets.VENDOR_ASSETS[name][0]
+
+@app.template_global()
+def asset_preloads():
+    return [(url_for('static', filename=built), kind) for built, kind in asset_manifest.preloads()]
+
+def precompressed_static(filename):
+    # لو فيه نسخة .br أو .gz جاهزة من build-assets بنبعتها بدل ما نضغط مع كل request
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+    for coding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if coding not in accepted and '*' not in accepted:
+            continue
+        path = safe_join(app.static_folder, filename + suffix)
+        if path and os.path.isfile(path):
+            response = send_from_directory(app.static_folder, filename + suffix,
+                                           mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            response.headers['Content-Encoding'] = coding
+            response.vary.add('Accept-Encoding')
+            return response
+    return app.send_static_file(filename)
+
+app.view_functions['static'] = precompressed_static
+
+@app.after_request
+def immutable_static_assets(response):
+    filename = (request.view_args or {}).get('filename', '')
+    if request.endpoint == 'static' and filename.startswith(assets.DIST_DIR + '/') and response.status_code in (200, 304):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
 # ---------------------------------------------------------
 # 6. ROUTES
 # ---------------------------------------------------------
 
+# الرسم (pandas + matplotlib) بيحصل بس لما الرد مش في الكاش، وده اللي بيتحدد:
+# RENDER_CONCURRENCY في نفس الوقت والباقي في طابور محدود، واللي يزيد بياخد 503 + Retry-After.
+# الصفحات الخفيفة والردود المتكاشة مش بتعدي على الـ admission خالص
+admission = AdmissionController(
+    max_concurrent=int(os.environ.get('RENDER_CONCURRENCY', max(2, os.cpu_count() or 1))),
+    max_queue=int(os.environ.get('RENDER_QUEUE', '16')),
+    queue_timeout=float(os.environ.get('RENDER_QUEUE_TIMEOUT', '5')),
+)
+
+# Token bucket لكل IP على POST بتاع login/register (قبل الـ hash البطيء)، ولكل (IP، رقم جلوس)
+# على الـ login بيتخصم بس لما الباسورد يطلع غلط: كده محدش يقدر يقفل حساب حد تاني
+# بإنه يبعت باسوردات غلط برقمه من جهاز تاني
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT', '1') != '0'
+TRUST_FORWARDED_FOR = os.environ.get('TRUST_FORWARDED_FOR', '1' if os.environ.get('VERCEL') else '0') == '1'
+login_ip_limiter = RateLimiter(float(os.environ.get('LOGIN_RATE_PER_IP', '30')), int(os.environ.get('LOGIN_BURST_PER_IP', '10')))
+login_id_limiter = RateLimiter(float(os.environ.get('LOGIN_RATE_PER_ID', '10')), int(os.environ.get('LOGIN_BURST_PER_ID', '5')))
+register_ip_limiter = RateLimiter(float(os.environ.get('REGISTER_RATE_PER_IP', '10')), int(os.environ.get('REGISTER_BURST_PER_IP', '5')))
+
+def client_ip():
+    # X-Forwarded-For بيتصدق بس ورا proxy معروف (Vercel)، غير كده أي حد يقدر يزوره
+    if TRUST_FORWARDED_FOR and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or 'unknown'
+
+def rate_limit_wait(*checks):
+    """Seconds to wait before retrying, 0 if every (limiter, key) pair allows the request."""
+    if not RATE_LIMIT_ENABLED:
+        return 0
+    return max(limiter.hit(key) for limiter, key in checks)
+
+def rate_limit_peek(limiter, key):
+    """Seconds to wait before ``key`` may try again, without taking a token."""
+    if not RATE_LIMIT_ENABLED:
+        return 0
+    return limiter.peek(key)
+
+def too_many_attempts(template, wait):
+    flash(f'Too many attempts, please try again in {int(wait) + 1} seconds.', 'error')
+    response = app.make_response((render_template(template), 429))
+    response.headers['Retry-After'] = str(int(wait) + 1)
+    return response
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    response = app.response_class('Server is busy, please retry in a few seconds.', status=503, mimetype='text/plain')
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
@@ -1027,25 +985,36 @@ def register():
     if request.method == 'POST':
         student_id = request.form.get('student_id').strip()
         password = request.form.get('password')
+        wait = rate_limit_wait((register_ip_limiter, client_ip()))
+        if wait:
+            return too_many_attempts('register.html', wait)
         
-        if sheet1_df.empty:
+        data = get_data()
+        if data.sheet1_df.empty:
             flash('Error: Database not loaded.')
             return redirect(url_for('register'))
             
         # 1. Check Admin
         if student_id.upper() == 'ADMIN':
             if not User.query.filter_by(student_id='ADMIN').first():
-                new_admin = User(student_id='ADMIN', password=generate_password_hash(password), is_admin=True, has_paid=True)
+                new_admin = User(student_id='ADMIN', password=password_hasher.hash(password), is_admin=True, has_paid=True)
                 db.session.add(new_admin)
                 db.session.commit()
             flash('Admin account recognized.', 'success')
             return redirect(url_for('login'))
 
         # 2. Check Excel
-        if sheet1_df[sheet1_df['ID'] == student_id].empty:
+        if student_id not in data.student_index:
             flash('Error: ID not found in records.', 'error')
             return redirect(url_for('register'))
             
+        # الـ hash البطيء قبل أي query، عشان الاتصال بالداتابيز ميفضلش محجوز وهو بيتحسب
+        try:
+            password_hash = password_hasher.hash(password)
+        except HashingBusy:
+            flash('Server is busy, please try again in a minute.', 'error')
+            return render_template('register.html'), 503
+
         # 3. Check Duplicate
         if User.query.filter_by(student_id=student_id).first():
             flash('Account already exists.', 'error')
@@ -1056,14 +1025,14 @@ def register():
         if PreApproved.query.filter_by(student_id=student_id).first():
             is_preapproved = True
 
-        new_user = User(student_id=student_id, password=generate_password_hash(password), has_paid=is_preapproved)
+        new_user = User(student_id=student_id, password=password_hash, has_paid=is_preapproved)
         db.session.add(new_user)
         db.session.commit()
         
         flash('Registered successfully. Please login.', 'success')
         return redirect(url_for('login'))
         
-    return render_template_string(register_html)
+    return render_template('register.html')
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -1074,13 +1043,27 @@ def login():
         if student_id.upper() == 'ADMIN': student_id = 'ADMIN'
         
         password = request.form.get('password')
+        id_key = (client_ip(), student_id)
+        wait = max(rate_limit_peek(login_id_limiter, id_key), rate_limit_wait((login_ip_limiter, id_key[0])))
+        if wait:
+            return too_many_attempts('login.html', wait)
         user = User.query.filter_by(student_id=student_id).first()
+        # الاتصال يرجع للـ pool قبل الـ verify البطيء (الـ user بيفضل محمّل detached)
+        db.session.close()
         
-        if user and check_password_hash(user.password, password):
+        try:
+            valid = user is not None and password_hasher.verify(user.password, password)
+        except HashingBusy:
+            flash('Server is busy, please try again in a minute.', 'error')
+            return render_template('login.html'), 503
+        if valid:
+            if password_hasher.needs_rehash(user.password):
+                upgrade_password_hash(user, password)
             login_user(user)
             return redirect(url_for('main'))
+        rate_limit_wait((login_id_limiter, id_key))
         flash('Invalid ID or Password.', 'error')
-    return render_template_string(login_html)
+    return render_template('login.html')
 
 @app.route('/logout')
 @login_required
@@ -1103,15 +1086,25 @@ def payment():
             db.session.commit()
             flash('Request Sent! Please contact admin on Telegram.', 'success')
             
-    return render_template_string(payment_html)
+    return render_template('payment.html')
+
+ADMIN_PAGE_SIZE = int(os.environ.get('ADMIN_PAGE_SIZE', '50'))
 
 @app.route('/admin', methods=['GET', 'POST'])
 @login_required
 def admin_panel():
     if not current_user.is_admin: return "Access Denied", 403
     
-    requests = Payment.query.filter_by(status='Pending').all()
-    return render_template_string(admin_html, requests=requests)
+    # صفحة واحدة من الطابور بالـ keyset (id > after) ومعاها الـ User في نفس الـ query
+    after = request.args.get('after', type=int)
+    query = Payment.query.options(joinedload(Payment.user)).filter(Payment.status == 'Pending')
+    if after is not None:
+        query = query.filter(Payment.id > after)
+    requests = query.order_by(Payment.id).limit(ADMIN_PAGE_SIZE + 1).all()
+    next_after = requests[ADMIN_PAGE_SIZE - 1].id if len(requests) > ADMIN_PAGE_SIZE else None
+    pending_count = db.session.query(db.func.count(Payment.id)).filter(Payment.status == 'Pending').scalar()
+    return render_template('admin.html', requests=requests[:ADMIN_PAGE_SIZE], pending_count=pending_count,
+                           after=after, next_after=next_after)
 
 # Pre-Approve Logic
 @app.route('/admin/preapprove', methods=['POST'])
@@ -1127,6 +1120,8 @@ def preapprove_id():
         pay_req = Payment.query.filter_by(user_id=existing_user.id, status='Pending').first()
         if pay_req: pay_req.status = 'Approved'
         db.session.commit()
+        invalidate_user_responses(existing_user.student_id)
+        invalidate_user_principal(existing_user.id)
         flash(f'User {sid} activated.', 'success')
     else:
         # 2. Add to Whitelist
@@ -1138,6 +1133,122 @@ def preapprove_id():
             flash(f'ID {sid} is already whitelisted.', 'error')
             
     return redirect(url_for('admin_panel'))
+
+# Bulk Pre-Approve: نفس منطق preapprove_id لقايمة IDs كاملة في transaction واحدة،
+# بـ statements على الـ set كله (IN (...)) بدل query لكل ID
+BULK_PREAPPROVE_MAX_IDS = int(os.environ.get('BULK_PREAPPROVE_MAX_IDS', '20000'))
+BULK_CHUNK_SIZE = 500  # أقل من حد الـ bind parameters في SQLite/Postgres
+ID_HEADERS = ('id', 'student_id', 'student id', 'seat', 'رقم الجلوس')
+
+def parse_student_ids(text):
+    """IDs from pasted text or a CSV, in input order (duplicates kept for the report).
+
+    A CSV whose first row names an ID column (``ID_HEADERS``) contributes that
+    column only; anything else is split on commas, semicolons, tabs and whitespace.
+    """
+    rows = list(csv.reader(io.StringIO(re.sub(r'[;\t]', ',', text or ''))))
+    header = [cell.strip().lower() for cell in rows[0]] if rows else []
+    column = next((i for i, cell in enumerate(header) if cell in ID_HEADERS), None)
+    if column is not None:
+        return [row[column].strip() for row in rows[1:] if len(row) > column and row[column].strip()]
+    return [token for row in rows for cell in row for token in cell.split()]
+
+def _chunks(items, size=BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def bulk_preapprove(student_ids, data):
+    """Activate registered students and whitelist the rest, all in one commit.
+
+    Returns ``(results, payments_approved)`` where results is a list of
+    ``(student_id, outcome)`` in input order. Outcomes: invalid (not in the
+    cohort), duplicate, activated, already_active, preapproved,
+    already_whitelisted. Nothing is written if any statement fails.
+    """
+    results, seen, valid = [], set(), []
+    for sid in student_ids:
+        if sid in seen:
+            results.append([sid, 'duplicate'])
+        elif sid not in data.student_index:
+            results.append([sid, 'invalid'])
+        else:
+            valid.append(sid)
+            results.append([sid, None])
+        seen.add(sid)
+
+    try:
+        users = {}
+        for chunk in _chunks(valid):
+            rows = db.session.execute(select(User.id, User.student_id, User.has_paid).where(User.student_id.in_(chunk)))
+            users.update((sid, (uid, paid)) for uid, sid, paid in rows)
+        whitelisted = set()
+        for chunk in _chunks([sid for sid in valid if sid not in users]):
+            whitelisted.update(db.session.scalars(select(PreApproved.student_id).where(PreApproved.student_id.in_(chunk))))
+
+        # الـ bulk update مبيعديش على mapper events، فالكاش بيتمسح بإيدنا تحت بعد الـ commit
+        activate = [uid for uid, paid in users.values() if not paid]
+        for chunk in _chunks(activate):
+            db.session.execute(update(User).where(User.id.in_(chunk)).values(has_paid=True),
+                               execution_options={'synchronize_session': False})
+        payments_approved = 0
+        for chunk in _chunks([uid for uid, _ in users.values()]):
+            payments_approved += db.session.execute(
+                update(Payment).where(Payment.user_id.in_(chunk), Payment.status == 'Pending').values(status='Approved'),
+                execution_options={'synchronize_session': False}).rowcount
+        new = [sid for sid in valid if sid not in users and sid not in whitelisted]
+        if new:
+            db.session.execute(insert(PreApproved), [{'student_id': sid} for sid in new])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    activated = [(sid, uid) for sid, (uid, paid) in users.items() if not paid]
+    # discard واحد لكل الدفعة: مع الكاش على الديسك كل discard بيلف على الفولدر كله
+    invalidate_user_responses(*(sid for sid, _ in activated))
+    for _, uid in activated:
+        invalidate_user_principal(uid)
+    for row in results:
+        sid = row[0]
+        if row[1] is None:
+            if sid in users:
+                row[1] = 'already_active' if users[sid][1] else 'activated'
+            else:
+                row[1] = 'already_whitelisted' if sid in whitelisted else 'preapproved'
+    return [tuple(row) for row in results], payments_approved
+
+def outcome_counts(results):
+    counts = dict.fromkeys(('activated', 'already_active', 'preapproved', 'already_whitelisted', 'invalid', 'duplicate'), 0)
+    for _, outcome in results:
+        counts[outcome] += 1
+    return counts
+
+@app.route('/admin/preapprove/bulk', methods=['POST'])
+@login_required
+def preapprove_bulk():
+    if not current_user.is_admin: return redirect(url_for('main'))
+    upload = request.files.get('file')
+    if upload and upload.filename:
+        text = upload.read().decode('utf-8-sig', errors='replace')
+    else:
+        text = request.form.get('student_ids', '')
+    student_ids = parse_student_ids(text)
+    if len(student_ids) > BULK_PREAPPROVE_MAX_IDS:
+        return f"Too many IDs ({len(student_ids)} > {BULK_PREAPPROVE_MAX_IDS})", 400
+
+    started = time.perf_counter()
+    try:
+        results, payments_approved = bulk_preapprove(student_ids, get_data())
+    except Exception as e:
+        print(f"Bulk Pre-Approve Error: {e}")
+        return "Bulk pre-approve failed, nothing was changed.", 500
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    counts = outcome_counts(results)
+    if request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json':
+        return jsonify(counts=counts, payments_approved=payments_approved, elapsed_ms=round(elapsed_ms, 1),
+                       results=[{'student_id': sid, 'outcome': outcome} for sid, outcome in results])
+    return render_template('admin_bulk.html', results=results, counts=counts,
+                           payments_approved=payments_approved, elapsed_ms=elapsed_ms)
 @app.route('/admin/reset_password', methods=['POST'])
 @login_required
 def reset_password():
@@ -1150,14 +1261,36 @@ def reset_password():
     
     if user:
         # بنعمل تشفير للباسورد الجديد (123456) ونحفظه
-        user.password = generate_password_hash('123456')
+        user.password = password_hasher.hash('123456')
         db.session.commit()
+        invalidate_user_principal(user.id)
         flash(f'تم تغيير باسورد الطالب {sid} بنجاح إلى 123456', 'success')
     else:
         flash(f'رقم الجلوس {sid} غير مسجل في الموقع!', 'error')
         
     return redirect(url_for('admin_panel'))
 
+@app.route('/admin/stats')
+@login_required
+def admin_stats():
+    if not current_user.is_admin: return "Access Denied", 403
+    return jsonify(data_version=get_data().version, data_store=data_store.stats(),
+                   chart_cache=chart_cache.stats(), need_curve_cache=need_curve_cache.stats(),
+                   response_cache=response_cache.stats(), user_cache=user_cache.stats(),
+                   password_hasher=password_hasher.stats(), admission=admission.stats(),
+                   rate_limits={'login_ip': login_ip_limiter.stats(), 'login_id': login_id_limiter.stats(),
+                                'register_ip': register_ip_limiter.stats()})
+
+@app.route('/admin/reload-data', methods=['POST'])
+@login_required
+def admin_reload_data():
+    if not current_user.is_admin: return "Access Denied", 403
+    try:
+        swapped = data_store.reload()
+    except Exception as e:
+        return jsonify(reloaded=False, error=str(e), data_store=data_store.stats()), 500
+    return jsonify(reloaded=swapped, data_store=data_store.stats())
+
 @app.route('/approve/<int:req_id>')
 @login_required
 def approve_payment(req_id):
@@ -1168,159 +1301,212 @@ def approve_payment(req_id):
         user = User.query.get(req.user_id)
         if user: user.has_paid = True
         db.session.commit()
+        if user:
+            invalidate_user_responses(user.student_id)
+            invalidate_user_principal(user.id)
     return redirect(url_for('admin_panel'))
 
 # ---------------------------------------------------------
 # 7. MAIN LOGIC (UPDATED MATH + ORIGINAL CHARTS)
 # ---------------------------------------------------------
+# Constants
+CURRENT_TOTAL_MAX = 3180 
+FINAL_TOTAL_MAX = 4875
+REMAINING_MAX = 1695
+RANK_MILESTONES = (1, 10, 50, 100, 200, 300, 500)
+
+CHART_KINDS = ('distribution', 'rank-progress')
+RESPONSE_CACHE_MODES = ('search', 'need', 'distance')
+MAIN_TEMPLATE_VERSION = hashlib.sha1(TEMPLATES['main.html'].encode('utf-8')).hexdigest()[:12]
+# زوّد الرقم ده لما شكل أي رسمة يتغير عشان الـ prerender يعيد رسم الكل
+CHART_STYLE_VERSION = 1
+CHART_MAX_AGE = int(os.environ.get('CHART_MAX_AGE', '3600'))
+
+def has_chart(data, record, kind):
+    if kind == 'distribution':
+        return not data.sheet1_df.empty and record.total is not None
+    return not data.sheet2_df.empty and bool(record.rank_points[0])
+
+# رسومات متجهزة مسبقاً بـ flask prerender-charts (ملفات باسم الـ hash بتاع محتواها)
+PRERENDER_DIR = os.environ.get('PRERENDER_DIR', 'prerendered')
+_prerender_manifest = {'mtime': None, 'charts': {}}
+
+def chart_input_hash(data, record, kind):
+    if kind == 'distribution':
+        inputs = (data.totals_digest, repr(record.raw['TOTAL']), CURRENT_TOTAL_MAX)
+    else:
+        inputs = record.rank_points
+    key = repr((CHART_STYLE_VERSION, kind, inputs))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def read_prerender_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f).get('charts', {})
+    except (OSError, ValueError):
+        return {}
+
+def prerendered_chart_path(student_id, kind, input_hash):
+    manifest_path = os.path.join(PRERENDER_DIR, 'manifest.json')
+    try:
+        mtime = os.path.getmtime(manifest_path)
+    except OSError:
+        return None
+    if mtime != _prerender_manifest['mtime']:
+        _prerender_manifest['charts'] = read_prerender_manifest(PRERENDER_DIR)
+        _prerender_manifest['mtime'] = mtime
+    entry = _prerender_manifest['charts'].get(f"{student_id}:{kind}")
+    if not entry or entry.get('input') != input_hash:
+        return None
+    return os.path.join(PRERENDER_DIR, entry['file'])
+
+def read_file_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def render_chart(data, record, kind):
+    import charts  # matplotlib بيتحمل هنا بس، أول مرة نحتاج نرسم فعلاً
+    if kind == 'distribution':
+        return charts.render_distribution(data.total_scores, record.total, CURRENT_TOTAL_MAX)
+    return charts.render_rank_progress(record.ranks)
+
+def get_chart_png(data, student_id, kind):
+    record = data.student_index.get(student_id)
+    if record is None or not has_chart(data, record, kind):
+        return None
+    path = prerendered_chart_path(student_id, kind, chart_input_hash(data, record, kind))
+    if path is not None and os.path.exists(path):
+        render = lambda: read_file_bytes(path)
+    else:
+        render = lambda: admission.run('chart', lambda: render_chart(data, record, kind))
+    return chart_cache.get_or_render((student_id, kind, data.version), render)
+
+@app.route('/chart/<kind>.png')
+@login_required
+def chart_image(kind):
+    if not current_user.has_paid and not current_user.is_admin:
+        return "Access Denied", 403
+    if kind not in CHART_KINDS:
+        return "Not Found", 404
+
+    data = get_data()
+    student_id = current_user.student_id
+    etag = hashlib.sha1(f"{data.version}:{student_id}:{kind}".encode('utf-8')).hexdigest()
+    # 304 قبل ما نلمس الرسم أصلاً
+    if not is_resource_modified(request.environ, etag=etag, last_modified=data.modified_at):
+        response = app.response_class(status=304)
+    else:
+        try:
+            png = get_chart_png(data, student_id, kind)
+        except Overloaded:
+            raise
+        except Exception as e:
+            print(f"Chart Error ({kind}): {e}")
+            return "Chart Error", 500
+        if png is None:
+            return "Not Found", 404
+        response = app.response_class(png, mimetype='image/png')
+    response.set_etag(etag)
+    response.last_modified = data.modified_at
+    response.cache_control.private = True
+    response.cache_control.max_age = CHART_MAX_AGE
+    response.vary.add('Cookie')
+    return response
+
 @app.route('/', methods=['GET', 'POST'])
 @login_required
 def main():
     if not current_user.has_paid and not current_user.is_admin:
         return redirect(url_for('payment'))
 
-    student_id = current_user.student_id
+    data = get_data()
     mode = request.args.get('mode', 'search')
-    
+    if request.method != 'GET' or mode not in RESPONSE_CACHE_MODES:
+        return admission.run('page', lambda: render_main_page(data, mode))
+
+    # الـ GET بتاع أي mode ثابت لنفس الطالب ونفس نسخة الداتا ونفس القالب،
+    # فالـ ETag بيتحسب من المفتاح نفسه ونرد 304 من غير ما نرندر حاجة
+    key = response_cache_key(data, mode)
+    etag = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    if not is_resource_modified(request.environ, etag=etag):
+        response = app.response_class(status=304)
+    else:
+        body = response_cache.get_or_render(key, lambda: admission.run('page', lambda: render_main_page(data, mode)).encode('utf-8'))
+        response = app.response_class(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+def response_cache_key(data, mode):
+    # data.version آخر عنصر عشان _on_data_swap يمسح النسخ القديمة
+    return (current_user.student_id, mode, bool(current_user.is_admin), MAIN_TEMPLATE_VERSION,
+            asset_manifest.version, data.version)
+
+def invalidate_user_responses(*student_ids):
+    if not student_ids:
+        return
+    student_ids = set(student_ids)
+    response_cache.discard(lambda key: key[0] in student_ids)
+
+def render_main_page(data, mode):
+    student_id = current_user.student_id
     result = None
     plot_url = None
     rank_progress_url = None
     percentile = None
+    percentiles = {}
     need_result = None
+    need_curve = None
     distance_result = None
 
-    # Constants
-    CURRENT_TOTAL_MAX = 3180 
-    FINAL_TOTAL_MAX = 4875
-    REMAINING_MAX = 1695
-
     if mode == 'search':
-        if not sheet1_df.empty:
-            match = sheet1_df[sheet1_df['ID'] == student_id]
-            if not match.empty:
-                raw = match.iloc[0].to_dict()
-                formatted = {}
-                for k, v in raw.items():
-                    if isinstance(v, float):
-                        if '%' in k or k.upper() in ['%', 'PERCENTAGE']:
-                            formatted[k] = f"{round(v*100, 2)}%" if v <= 1 else f"{round(v, 2)}%"
-                        elif v.is_integer():
-                            formatted[k] = int(v)
-                        else:
-                            formatted[k] = round(v, 2)
-                    else:
-                        formatted[k] = v
-                result = formatted
+        if not data.sheet1_df.empty:
+            record = data.student_index.get(student_id)
+            if record is not None:
+                result = record.result
+                # المئين لكل مادة/سنة متحسب مرة واحدة مع الداتا (dataset.PercentileMatrix)
+                percentiles = data.percentiles.for_student(student_id)
                 
-                # RESTORED PLOT 1 (Exact features)
+                # الرسومات بتتحمل من /chart/<kind>.png عشان الصفحة تظهر فوراً والمتصفح يكاشها
                 try:
-                    total_scores = sheet1_df['TOTAL'].dropna()
-                    student_score = raw.get('TOTAL')
-                    if pd.notna(student_score):
-                        percentile = round((total_scores < student_score).mean() * 100)
-                        avg_score = total_scores.mean()
-                        avg_pct = (avg_score / CURRENT_TOTAL_MAX) * 100
-                        
-                        plt.figure(figsize=(8, 5))
-                        plt.hist(total_scores, bins=20, color='#66b3ff', edgecolor='black')
-                        plt.axvline(student_score, color='orange', linestyle='solid', linewidth=2, label=f'Student Score: {student_score}')
-                        plt.axvline(avg_score, color='black', linestyle='dashed', linewidth=2, label=f'Class Average ({round(avg_pct, 2)}%)')
-                        
-                        ymax = plt.gca().get_ylim()[1]
-                        y_line = ymax * 0.7
-                        plt.hlines(y_line, min(avg_score, student_score), max(avg_score, student_score), colors='red', linestyles='dashed', linewidth=2)
-                        
-                        mid_x = (student_score + avg_score) / 2
-                        diff_pct = round(abs(student_score - avg_score) / CURRENT_TOTAL_MAX * 100, 1)
-                        plt.text(mid_x, y_line + ymax * 0.03, f'{diff_pct}%', fontsize=10, fontweight='bold', ha='center', color='red')
-                        
-                        plt.plot([], [], 'r--', label='% above/below average') # Legacy label restoration
-                        plt.xlabel('Scores')
-                        plt.ylabel('Number of Students')
-                        plt.title('Score Distribution with Student Highlighted')
-                        plt.legend()
-                        
-                        buf = io.BytesIO()
-                        plt.savefig(buf, format='png')
-                        buf.seek(0)
-                        plot_url = base64.b64encode(buf.getvalue()).decode('utf8')
-                        buf.close()
-                        plt.close()
+                    student_score = record.total
+                    if student_score is not None:
+                        if 'TOTAL' in percentiles:
+                            percentile = round(percentiles['TOTAL'])
+                        plot_url = url_for('chart_image', kind='distribution', v=data.version)
                 except Exception as e:
                     print(f"Plot 1 Error: {e}")
 
-                # RESTORED PLOT 2 (Exact features + Arrows)
                 try:
-                    if not sheet2_df.empty:
-                        rank_match = sheet2_df[sheet2_df['ID'] == student_id]
-                        if not rank_match.empty:
-                            rank_data = rank_match.iloc[0].to_dict()
-                            rank_cols = {
-                                "FIRST YEAR RANK": ("FIRST YEAR", "#e0f7fa"),
-                                "SECOND YEAR RANK C": ("SECOND YEAR", "#fff3e0"),
-                                "THIRD YEAR RANK C": ("THIRD YEAR", "#ede7f6"),
-                                "FOURTH YEAR RANK C": ("FOURTH YEAR", "#d0e0ff"),
-                            }
-                            # ... (جزء Plot 2) ...
-                            labels, values, colors = [], [], []
-                            for col, (lbl, clr) in rank_cols.items():
-                                val = rank_data.get(col)
-                                if pd.notna(val):
-                                    try:
-                                        # إجبار القيمة إنها تكون رقم عشان نتفادى خطأ الـ string
-                                        numeric_val = float(val)
-                                        labels.append(lbl)
-                                        values.append(numeric_val)
-                                        colors.append(clr)
-                                    except ValueError:
-                                        pass # لو الخانة فاضية أو فيها كلام مش رقم، يتجاهلها
-                                        
-                            if labels:
-                                plt.figure(figsize=(8, 5))
-                                # ... (باقي كود الرسم زي ما هو) ...
-                                plt.plot(labels, values, marker='o', linestyle='-', color='black', linewidth=2)
-                                for i in range(len(labels)):
-                                    plt.plot(labels[i], values[i], '3', markersize=10, color=colors[i])
-                                    plt.text(labels[i], values[i]+0.5, f'{int(values[i])}', ha='center', va='top', fontsize=14, fontweight='bold', color='black', bbox=dict(boxstyle='round,pad=0.4', facecolor='white', edgecolor='black'))
-                                    
-                                    # Arrow Logic from original code
-                                    if i > 0:
-                                        change = values[i-1] - values[i]
-                                        c_color = 'green' if change > 0 else 'red'
-                                        sign = '+' if change > 0 else ''
-                                        arrow = '⬆' if change > 0 else '⬇'
-                                        mid_x = (i - 0.5)
-                                        mid_y = (values[i-1] + values[i]) / 2
-                                        plt.text(mid_x, mid_y + 2.5, f'{arrow} {sign}{abs(int(change))}', fontsize=11, fontweight='bold', color=c_color, ha='center', va='top', bbox=dict(boxstyle='round,pad=0.2', facecolor='white', edgecolor=c_color))
-
-                                plt.ylabel('Cumulative Rank')
-                                plt.title('Cumulative Progress Based on Class Rank')
-                                plt.gca().invert_yaxis()
-                                plt.grid(True)
-                                
-                                buf2 = io.BytesIO()
-                                plt.savefig(buf2, format='png')
-                                buf2.seek(0)
-                                rank_progress_url = base64.b64encode(buf2.getvalue()).decode('utf8')
-                                buf2.close()
-                                plt.close()
+                    if has_chart(data, record, 'rank-progress'):
+                        rank_progress_url = url_for('chart_image', kind='rank-progress', v=data.version)
                 except Exception as e:
                     print(f"Plot 2 Error: {e}")
 
-    elif mode == 'need' and request.method == 'POST':
+    elif mode == 'need':
+        record = data.student_index.get(student_id)
+        if record is not None and record.total is not None:
+            try:
+                need_curve = get_need_curve_json(data, student_id, record).decode('utf-8')
+            except Exception as e:
+                print(f"Need Curve Error: {e}")
+
+    if mode == 'need' and request.method == 'POST':
         try:
             target_pct = float(request.form.get('target_percentage'))
-            match = sheet1_df[sheet1_df['ID'] == student_id]
-            if not match.empty:
-                data = match.iloc[0]
-                curr_total = data.get('TOTAL', 0)
+            record = data.student_index.get(student_id)
+            if record is not None:
+                row = record.raw
+                curr_total = row.get('TOTAL', 0)
                 curr_pct = (curr_total / CURRENT_TOTAL_MAX) * 100
                 req_total_marks = (target_pct / 100) * FINAL_TOTAL_MAX
                 req_coming_marks = req_total_marks - curr_total
                 req_coming_pct = (req_coming_marks / REMAINING_MAX) * 100
                 
                 need_result = {
-                    'student_name': data.get('NAME'),
+                    'student_name': row.get('NAME'),
                     'current_percentage': round(curr_pct, 2),
                     'target_percentage': target_pct,
                     'required_coming_score': round(req_coming_marks, 2),
@@ -1331,42 +1517,129 @@ def main():
     elif mode == 'distance' and request.method == 'POST':
         try:
             target_rank = int(request.form.get('target_rank'))
-            match = sheet1_df[sheet1_df['ID'] == student_id]
-            if not match.empty:
-                curr_score = match.iloc[0]['TOTAL']
-                curr_rank = (sheet1_df['TOTAL'] > curr_score).sum() + 1
-                sorted_df = sheet1_df.sort_values('TOTAL', ascending=False).reset_index(drop=True)
-                if target_rank <= len(sorted_df):
-                    target_score = sorted_df.iloc[target_rank - 1]['TOTAL']
+            record = data.student_index.get(student_id)
+            if record is not None and record.total is not None:
+                curr_score = record.total
+                curr_rank = data.rank_index.rank_of(curr_score)
+                target_score = data.rank_index.score_at(target_rank)
+                if target_score is not None:
                     diff = target_score - curr_score
+                    ranks, points = data.rank_index.points_to(curr_score, RANK_MILESTONES)
                     distance_result = {
-                        'student_name': match.iloc[0]['NAME'],
+                        'student_name': record.raw['NAME'],
                         'current_rank': curr_rank,
                         'target_rank': target_rank,
-                        'points_needed': round(diff, 2)
+                        'points_needed': round(diff, 2),
+                        'milestones': [(int(r), round(float(p), 2)) for r, p in zip(ranks, points)]
                     }
         except: pass
 
-    return render_template_string(html_template, 
-                                  mode=mode, result=result, plot_url=plot_url, 
-                                  rank_progress_url=rank_progress_url, percentile=percentile,
-                                  need_result=need_result, distance_result=distance_result)
+    return render_template('main.html', 
+                           mode=mode, result=result, plot_url=plot_url, 
+                           rank_progress_url=rank_progress_url, percentile=percentile, percentiles=percentiles,
+                           need_result=need_result, need_curve=need_curve, distance_result=distance_result)
+
+def get_need_curve_json(data, student_id, record):
+    def render():
+        import dataset
+        curve = dataset.need_curve(data.rank_index, record.total, CURRENT_TOTAL_MAX, FINAL_TOTAL_MAX, REMAINING_MAX)
+        return json.dumps(curve, separators=(',', ':')).encode('utf-8')
+    return need_curve_cache.get_or_render((student_id, 'need-curve', data.version), lambda: admission.run('need-curve', render))
+
+@app.route('/api/need-curve')
+@login_required
+def api_need_curve():
+    if not current_user.has_paid and not current_user.is_admin:
+        return jsonify(error='payment required'), 403
+    data = get_data()
+    record = data.student_index.get(current_user.student_id)
+    if record is None or record.total is None:
+        return jsonify(error='student not found'), 404
+    return app.response_class(get_need_curve_json(data, current_user.student_id, record), mimetype='application/json')
+
+@app.route('/api/percentiles')
+@login_required
+def api_percentiles():
+    if not current_user.has_paid and not current_user.is_admin:
+        return jsonify(error='payment required'), 403
+    data = get_data()
+    percentiles = data.percentiles.for_student(current_user.student_id)
+    return jsonify(student_id=current_user.student_id, data_version=data.version,
+                   percentiles={col: round(p, 1) for col, p in percentiles.items()})
+
+@app.route('/api/residency-prediction')
+@login_required
+def api_residency_prediction():
+    if not current_user.has_paid and not current_user.is_admin:
+        return jsonify(error='payment required'), 403
+    import dataset
+    data = get_data()
+    record = data.student_index.get(current_user.student_id)
+    rank = dataset.student_rank(record) if record is not None else None
+    if rank is None:
+        return jsonify(error='student rank not found'), 404
+    return jsonify(student_id=current_user.student_id, data_version=data.version, **data.cutoffs.predict(rank))
+
+RESIDENCY_PER_PAGE = 100
+RESIDENCY_MAX_PER_PAGE = 500
+
+
+def int_arg(name, default=None, minimum=None, maximum=None):
+    try:
+        value = int(request.args.get(name, ''))
+    except ValueError:
+        return default
+    if minimum is not None:
+        value = max(value, minimum)
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
 
 @app.route('/residency')
 @login_required
 def residency_page():
     if not current_user.has_paid and not current_user.is_admin:
         return redirect(url_for('payment'))
+    data = get_data()
+    years = list(data.residency)
     year = request.args.get('year', '2024')
-    df = residency_25_df if year == '2025' else residency_24_df
-    results = []
-    boast = 0; no_boast = 0
-    if not df.empty:
-        results = df.to_dict('records')
-        for r in results:
-            if str(r.get('STATUS')).strip() == 'بوست': boast+=1
-            elif str(r.get('STATUS')).strip() == 'بدون بوست': no_boast+=1
-    return render_template_string(residency_template, year=year, results=results, df_empty=df.empty, boast_count=boast, no_boast_count=no_boast)
+    if year not in data.residency and years:
+        year = years[0]
+    index = data.residency.get(year)
+    if index is None or not index.rows:
+        return render_template('residency.html', year=year, years=years, df_empty=True)
+
+    # الفلترة كلها على الفهرس المتحسب مرة واحدة، وبنرندر صفحة واحدة بس من الصفوف
+    specialty = request.args.get('specialty', '').strip()
+    status = request.args.get('status', '').strip()
+    rank_min = int_arg('rank_min', minimum=1)
+    rank_max = int_arg('rank_max', minimum=1)
+    per_page = int_arg('per_page', RESIDENCY_PER_PAGE, minimum=1, maximum=RESIDENCY_MAX_PER_PAGE)
+    positions = index.query(specialty or None, status or None, rank_min, rank_max)
+    match_count = len(positions)
+    page_count = max(1, -(-match_count // per_page))
+    page = int_arg('page', 1, minimum=1, maximum=page_count)
+    start = (page - 1) * per_page
+    results = [index.rows[i] for i in positions[start:start + per_page]]
+
+    def page_url(n):
+        args = {'year': year, 'page': n, 'per_page': per_page}
+        for key, value in (('specialty', specialty), ('status', status), ('rank_min', rank_min), ('rank_max', rank_max)):
+            if value not in (None, ''):
+                args[key] = value
+        return url_for('residency_page', **args)
+
+    return render_template(
+        'residency.html', year=year, years=years, results=results, df_empty=False,
+        total_count=len(index.rows),
+        boast_count=index.status_counts.get('بوست', 0),
+        no_boast_count=index.status_counts.get('بدون بوست', 0),
+        statuses=sorted(s for s in index.status_counts if s),
+        specialty_stats=index.specialty_stats,
+        specialty=specialty, status=status, rank_min=rank_min, rank_max=rank_max,
+        filtered=bool(specialty or status or rank_min is not None or rank_max is not None),
+        match_count=match_count, page=page, page_count=page_count, per_page=per_page, page_url=page_url)
 
 # ... (بعد باقي الـ Routes)
 
@@ -1374,12 +1647,157 @@ def residency_page():
 def init_db():
     try:
         with app.app_context():
-            db.create_all()
+            create_tables()
         return "تم إنشاء جداول قاعدة البيانات بنجاح! ✅"
     except Exception as e:
         return f"حدث خطأ: {e}"
 
+# ---------------------------------------------------------
+# 8. CLI COMMANDS
+# ---------------------------------------------------------
+@app.cli.command('prerender-charts')
+@click.option('--jobs', '-j', type=int, default=None, help='Worker processes (default: CPU count).')
+@click.option('--out', 'out_dir', default=PRERENDER_DIR, show_default=True, help='Output directory.')
+@click.option('--force', is_flag=True, help='Re-render charts whose inputs have not changed.')
+def prerender_charts_command(jobs, out_dir, force):
+    """Render Plot 1 and Plot 2 for every student ahead of time."""
+    from concurrent.futures import ProcessPoolExecutor
+    import charts
+    data = get_data()
+    if data.sheet1_df.empty:
+        raise click.ClickException('Student data not loaded.')
+    os.makedirs(out_dir, exist_ok=True)
+    previous = {} if force else read_prerender_manifest(out_dir)
+
+    entries, tasks, inputs = {}, [], {}
+    for student_id, record in data.student_index.items():
+        for kind in CHART_KINDS:
+            if not has_chart(data, record, kind):
+                continue
+            key = f"{student_id}:{kind}"
+            input_hash = chart_input_hash(data, record, kind)
+            prev = previous.get(key)
+            if prev and prev.get('input') == input_hash and os.path.exists(os.path.join(out_dir, prev['file'])):
+                entries[key] = prev
+                continue
+            if kind == 'distribution':
+                payload = (record.raw['TOTAL'], CURRENT_TOTAL_MAX)
+            else:
+                payload = dict(record.ranks)
+            inputs[key] = input_hash
+            tasks.append((student_id, kind, payload, out_dir))
+
+    skipped = len(entries)
+    jobs = jobs or os.cpu_count() or 1
+    total_scores = data.total_scores.to_numpy()
+    started = time.perf_counter()
+    if tasks:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=charts.init_prerender_worker,
+                                 initargs=(total_scores,)) as pool:
+            for student_id, kind, filename in pool.map(charts.prerender_chart, tasks, chunksize=8):
+                key = f"{student_id}:{kind}"
+                if filename:
+                    entries[key] = {'input': inputs[key], 'file': filename}
+    elapsed = time.perf_counter() - started
+
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    tmp = manifest_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'data_version': data.version, 'charts': entries}, f)
+    os.replace(tmp, manifest_path)
+
+    # امسح الملفات اللي مبقتش مستخدمة
+    live = {entry['file'] for entry in entries.values()}
+    for name in os.listdir(out_dir):
+        if name.endswith('.png') and name not in live:
+            os.remove(os.path.join(out_dir, name))
+
+    rate = len(tasks) / elapsed if elapsed > 0 else 0.0
+    click.echo(f"Rendered {len(tasks)} charts in {elapsed:.2f}s ({rate:.1f} charts/sec, {jobs} jobs); "
+               f"skipped {skipped} unchanged.")
+
+@app.cli.command('predict-residency')
+@click.option('--out', 'out_path', default=None, help='Output file (default: <PRERENDER_DIR>/predictions.json).')
+def predict_residency_command(out_path):
+    """Compute reachable specialties for the whole cohort in one pass."""
+    import dataset
+    data = get_data()
+    if data.sheet1_df.empty:
+        raise click.ClickException('Student data not loaded.')
+    out_path = out_path or os.path.join(PRERENDER_DIR, 'predictions.json')
+    started = time.perf_counter()
+    ids, ranks = [], []
+    for student_id, record in data.student_index.items():
+        rank = dataset.student_rank(record)
+        if rank is not None:
+            ids.append(student_id)
+            ranks.append(rank)
+    starts = data.cutoffs.reachable_from(ranks)
+
+    # لكل سنة: الـ cutoffs مترتبة، ولكل طالب أول موضع يقدر يوصله (الباقي كله reachable)
+    payload = {
+        'data_version': data.version,
+        'cutoffs': {yc.year: [[specialty, status, int(cutoff), int(best)]
+                              for (specialty, status), cutoff, best in zip(yc.keys, yc.cutoffs, yc.best)]
+                    for yc in data.cutoffs.years},
+        'students': {student_id: {'rank': int(rank), 'start': {year: int(arr[i]) for year, arr in starts.items()}}
+                     for i, (student_id, rank) in enumerate(zip(ids, ranks))},
+    }
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    tmp = out_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, out_path)
+    elapsed = time.perf_counter() - started
+    click.echo(f"Wrote predictions for {len(ids)} students to {out_path} in {elapsed:.2f}s.")
+
+@app.cli.command('preapprove-bulk')
+@click.argument('source', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--report', 'report_path', default=None, help='Write a student_id,outcome CSV here.')
+def preapprove_bulk_command(source, report_path):
+    """Pre-approve every ID in SOURCE (a CSV or plain list; - for stdin)."""
+    data = get_data()
+    if data.sheet1_df.empty:
+        raise click.ClickException('Student data not loaded.')
+    student_ids = parse_student_ids(source.read())
+    started = time.perf_counter()
+    results, payments_approved = bulk_preapprove(student_ids, data)
+    elapsed = time.perf_counter() - started
+    if report_path:
+        with open(report_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['student_id', 'outcome'])
+            writer.writerows(results)
+    for sid, outcome in results:
+        if outcome in ('invalid', 'duplicate'):
+            click.echo(f"{outcome:<10} {sid}")
+    summary = ', '.join(f"{outcome}={n}" for outcome, n in outcome_counts(results).items())
+    click.echo(f"{len(results)} IDs in {elapsed * 1000:.0f} ms: {summary}, payments_approved={payments_approved}")
+
+@app.cli.command('build-assets')
+@click.option('--fetch', is_flag=True, help='Download the CDN fonts/images into static/vendor first.')
+@click.option('--clean', is_flag=True, help='Delete built files the new manifest no longer references.')
+def build_assets_command(fetch, clean):
+    """Minify and fingerprint static/css and static/vendor into static/dist."""
+    if fetch:
+        assets.fetch_vendor(app.static_folder, log=click.echo)
+    manifest = assets.build(app.static_folder, log=click.echo)
+    if clean:
+        click.echo(f"Removed {assets.prune(app.static_folder, manifest)} stale files.")
+
+@app.cli.command('build-snapshot')
+@click.option('--out', 'out_path', default=None, help='Snapshot path (default: DATA_SNAPSHOT or data.snapshot).')
+def build_snapshot_command(out_path):
+    """Clean the CSV files once and write the binary data snapshot."""
+    import dataset
+    path = out_path or dataset.DATA_SNAPSHOT
+    started = time.perf_counter()
+    content_hash, frames = dataset.build_snapshot(path)
+    elapsed = time.perf_counter() - started
+    rows = ', '.join(f"{name}={len(df)}" for name, df in frames.items())
+    click.echo(f"Wrote {path} ({os.path.getsize(path) / 1024:.0f} KiB, version {content_hash}) in {elapsed:.2f}s: {rows}")
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        create_tables()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,273 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import posixpath
+import threading
+from urllib.parse import urljoin, urlparse
+
+# ---------------------------------------------------------
+# STATIC ASSETS (SELF-HOSTED VENDOR FILES + FINGERPRINTED BUILD)
+# ---------------------------------------------------------
+# الملفات الخارجية اللي كانت بتتحمل من الـ CDN مع كل زيارة. `flask build-assets --fetch`
+# بينزلها في static/vendor، ولو مش متنزلة القوالب بترجع للـ URL الأصلي
+VENDOR_ASSETS = {
+    'cairo': ('https://fonts.googleapis.com/css2?family=Cairo:wght@400;600;700&display=swap', 'vendor/cairo/cairo.css'),
+    'fontawesome': ('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
+                    'vendor/fontawesome/css/all.min.css'),
+    # خلفية صفحات الدخول والصفحات الداخلية صورة واحدة (الرابط المباشر، مش صفحة ibb.co)
+    'bg': ('https://i.ibb.co/zHRhsP6j/bg.jpg', 'vendor/img/bg.jpg'),
+    'logo': ('https://i.postimg.cc/0rHzBdbx/8.jpg', 'vendor/img/logo.jpg'),
+    'telegram': ('https://upload.wikimedia.org/wikipedia/commons/8/82/Telegram_logo.svg', 'vendor/img/telegram.svg'),
+}
+
+# اللي بيتعمله preload في <head>: خطوط Cairo (بعد الـ fetch) وخلفية صفحات الدخول
+PRELOAD_VENDOR_FONTS = ('cairo',)
+PRELOAD_VENDOR_IMAGES = ('bg',)
+
+BUILD_SOURCES = ('css', 'vendor')
+# نسخ .gz/.br جاهزة جنب كل ملف نصي في dist (الـ woff2 والصور مضغوطة أصلًا)
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.ttf', '.eot')
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+FETCH_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                    '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+CSS_COMMENT_RE = re.compile(r'/\*(?!!).*?\*/', re.S)  # /*! ... */ فيها الترخيص فبتفضل
+
+
+def minify_css(css):
+    css = CSS_COMMENT_RE.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip() + '\n'
+
+
+def _fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _fetch(url, accept=None):
+    import urllib.request
+    request = urllib.request.Request(url, headers={'User-Agent': FETCH_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        content_type = response.headers.get('Content-Type', '')
+        if accept and not content_type.startswith(accept):
+            raise ValueError(f"{url} returned {content_type or 'no content type'}, expected {accept}")
+        return response.read()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def fetch_vendor(static_dir, log=print):
+    """Download every VENDOR_ASSETS entry (and the files its CSS points at)."""
+    fetched = 0
+    for name, (url, rel) in VENDOR_ASSETS.items():
+        try:
+            if rel.endswith('.css'):
+                css = _fetch(url, accept='text/css').decode('utf-8')
+                base = posixpath.dirname(rel)
+
+                def localize(match):
+                    ref = match.group(2)
+                    if ref.startswith('data:'):
+                        return match.group(0)
+                    absolute = urljoin(url, ref)
+                    parsed = urlparse(absolute)
+                    # خطوط جوجل على دومين تاني فبتتحط في fonts/ جنب الـ CSS،
+                    # والمسارات النسبية (../webfonts/ بتاعة Font Awesome) بتفضل زي ما هي
+                    if urlparse(ref).scheme:
+                        local = posixpath.join('fonts', posixpath.basename(parsed.path))
+                    else:
+                        local = ref.split('#')[0].split('?')[0]
+                    target = posixpath.normpath(posixpath.join(base, local))
+                    _write(os.path.join(static_dir, *target.split('/')), _fetch(absolute))
+                    suffix = '#' + parsed.fragment if parsed.fragment else ''
+                    return f"url({local}{suffix})"
+
+                css = CSS_URL_RE.sub(localize, css)
+                _write(os.path.join(static_dir, *rel.split('/')), css.encode('utf-8'))
+            else:
+                _write(os.path.join(static_dir, *rel.split('/')), _fetch(url, accept='image/'))
+            fetched += 1
+            log(f"fetched {name}: {url}")
+        except Exception as e:
+            log(f"Fetch Error ({name}): {e}")
+    return fetched
+
+
+def build(static_dir, log=print):
+    """Minify and fingerprint static/css + static/vendor into static/dist.
+
+    CSS ``url()`` references to other built files (and to vendored remote
+    URLs) are rewritten to their fingerprinted paths. Returns the manifest.
+    """
+    sources = []
+    for top in BUILD_SOURCES:
+        root = os.path.join(static_dir, top)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                if filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                sources.append(os.path.relpath(path, static_dir).replace(os.sep, '/'))
+    # الخطوط والصور الأول عشان الـ CSS يلاقي أسماءها الجديدة، وبعدين vendor CSS قبل بتاعنا
+    sources.sort(key=lambda rel: (rel.endswith('.css'), not rel.startswith('vendor/'), rel))
+
+    vendored = {url: rel for url, rel in VENDOR_ASSETS.values()}
+    files, source_hashes, missing = {}, {}, set()
+    for rel in sources:
+        with open(os.path.join(static_dir, *rel.split('/')), 'rb') as f:
+            data = f.read()
+        source_hashes[rel] = hashlib.sha256(data).hexdigest()
+        if rel.endswith('.css'):
+            base = posixpath.dirname(rel)
+
+            def rewrite(match):
+                ref = match.group(2)
+                path, sep, fragment = ref.partition('#')
+                if path in vendored:
+                    target = vendored[path]
+                elif urlparse(path).scheme or path.startswith(('data:', '/')):
+                    return match.group(0)
+                else:
+                    target = posixpath.normpath(posixpath.join(base, path.split('?')[0]))
+                built = files.get(target)
+                if built is None:
+                    if path in vendored:
+                        missing.add(path)
+                    return match.group(0)
+                local = posixpath.relpath(built, posixpath.join(DIST_DIR, base))
+                return f"url({local}{sep}{fragment})"
+
+            data = minify_css(CSS_URL_RE.sub(rewrite, data.decode('utf-8'))).encode('utf-8')
+        stem, ext = posixpath.splitext(rel)
+        if rel.endswith('.min.css'):
+            stem, ext = stem[:-len('.min')], '.min.css'
+        built = posixpath.join(DIST_DIR, f"{stem}.{_fingerprint(data)}{ext}")
+        _write(os.path.join(static_dir, *built.split('/')), data)
+        if built.endswith(PRECOMPRESS_EXTENSIONS):
+            precompress(os.path.join(static_dir, *built.split('/')), data)
+        files[rel] = built
+
+    preload = []
+    for name in PRELOAD_VENDOR_FONTS:
+        css_rel = VENDOR_ASSETS[name][1]
+        if css_rel in files:
+            prefix = posixpath.dirname(css_rel) + '/'
+            preload += [[files[rel], 'font'] for rel in sorted(files) if rel.startswith(prefix) and rel.endswith('.woff2')]
+    for name in PRELOAD_VENDOR_IMAGES:
+        if VENDOR_ASSETS[name][1] in files:
+            preload.append([files[VENDOR_ASSETS[name][1]], 'image'])
+
+    manifest = {
+        'files': files,
+        'sources': source_hashes,
+        'vendor': {name: files[rel] for name, (_, rel) in VENDOR_ASSETS.items() if rel in files},
+        'preload': preload,
+    }
+    _write(os.path.join(static_dir, DIST_DIR, MANIFEST_NAME),
+           json.dumps(manifest, indent=1, sort_keys=True).encode('utf-8'))
+    log(f"built {len(files)} assets into {os.path.join(static_dir, DIST_DIR)}")
+    for url in sorted(missing):
+        # الـ CSS المبني لسه بيحمل الملف ده من برا لحد ما يتعمله fetch
+        log(f"not vendored (run with --fetch): {url}")
+    return manifest
+
+
+def precompress(path, data):
+    """Write ``path.gz`` (and ``path.br`` when Brotli is installed) at max level."""
+    _write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return
+    _write(path + '.br', brotli.compress(data, quality=11))
+
+
+def prune(static_dir, manifest):
+    """Delete built files that the manifest no longer references."""
+    live = set(manifest['files'].values()) | {posixpath.join(DIST_DIR, MANIFEST_NAME)}
+    live |= {built + suffix for built in live for suffix in ('.gz', '.br')}
+    removed = 0
+    root = os.path.join(static_dir, DIST_DIR)
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            rel = os.path.relpath(os.path.join(dirpath, filename), static_dir).replace(os.sep, '/')
+            if rel not in live:
+                os.remove(os.path.join(dirpath, filename))
+                removed += 1
+    return removed
+
+
+class AssetManifest:
+    """The built manifest, re-read when its mtime changes.
+
+    Entries whose source file changed since the build are ignored, so an
+    edited CSS file is served unfingerprinted until the next build instead of
+    serving the stale built copy.
+    """
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self.path = os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)
+        self._mtime = False
+        self._state = ({}, {}, (), '')
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return self._state
+        with self._lock:
+            if mtime == self._mtime:
+                return self._state
+            files, vendor, preload, version = {}, {}, (), ''
+            if mtime is not None:
+                try:
+                    with open(self.path, encoding='utf-8') as f:
+                        manifest = json.load(f)
+                    for rel, built in manifest['files'].items():
+                        try:
+                            with open(os.path.join(self.static_dir, *rel.split('/')), 'rb') as f:
+                                current = hashlib.sha256(f.read()).hexdigest()
+                        except OSError:
+                            current = None
+                        if current == manifest['sources'].get(rel):
+                            files[rel] = built
+                    vendor = {name: built for name, built in manifest['vendor'].items() if built in files.values()}
+                    preload = tuple((built, kind) for built, kind in manifest['preload'] if built in files.values())
+                    version = hashlib.sha1(json.dumps(sorted(files.items())).encode('utf-8')).hexdigest()[:12]
+                except Exception as e:
+                    print(f"Asset Manifest Error: {e}")
+            self._state = (files, vendor, preload, version)
+            self._mtime = mtime
+            return self._state
+
+    def path_for(self, rel):
+        """Static-relative path to serve for the source ``rel``."""
+        return self._load()[0].get(rel, rel)
+
+    def vendor(self, name):
+        """Static-relative path of a vendored asset, or None if not built."""
+        return self._load()[1].get(name)
+
+    def preloads(self):
+        return self._load()[2]
+
+    @property
+    def version(self):
+        return self._load()[3]
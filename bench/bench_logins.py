@@ -0,0 +1,127 @@
+"""Benchmark: logins/sec under concurrency, per password hashing worker count.
+
+Each worker count runs in its own process (the hasher is configured at
+import time) against a fresh SQLite file holding --users students. --threads
+clients log in at once while a probe thread keeps fetching a page that does
+no hashing, to show how much the KDF work slows everything else down.
+With --stored set to other parameters than the policy (e.g. a cheaper
+pbkdf2), the first round also measures the rehash-on-login upgrade and
+checks every user ended up on the current policy.
+
+Usage:  python bench/bench_logins.py [--workers 0,1,2] [--users 200] [--threads 16]
+                                     [--method scrypt] [--stored pbkdf2:sha256:100000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] * 1000 if samples else 0.0
+
+
+def run_child(args):
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from werkzeug.security import generate_password_hash
+
+    import app
+
+    ids = list(app.get_data().student_index)[:args.users]
+    stored = generate_password_hash('pw', method=args.stored or args.method)
+    with app.app.app_context():
+        app.create_tables()
+        app.db.session.execute(app.insert(app.User), [{'student_id': sid, 'password': stored, 'has_paid': True} for sid in ids])
+        app.db.session.commit()
+
+    def login_round():
+        latencies, failures = [], []
+        barrier = threading.Barrier(args.threads + 1)
+
+        def worker(chunk):
+            barrier.wait()
+            for sid in chunk:
+                client = app.app.test_client()
+                started = time.perf_counter()
+                response = client.post('/login', data={'student_id': sid, 'password': 'pw'})
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 302:
+                    failures.append(response.status_code)
+
+        probe_latencies, done = [], threading.Event()
+
+        def probe():
+            client = app.app.test_client()
+            barrier.wait()
+            while not done.is_set():
+                started = time.perf_counter()
+                client.get('/login')
+                probe_latencies.append(time.perf_counter() - started)
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=worker, args=(ids[i::args.threads],)) for i in range(args.threads)]
+        prober = threading.Thread(target=probe)
+        for t in threads + [prober]:
+            t.start()
+        started = time.perf_counter()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        prober.join()
+        return latencies, failures, probe_latencies, elapsed
+
+    # أول لفة بتعمل warm للـ workers (spawn) ولو فيه rehash بيحصل فيها
+    for label in ('first', 'warm'):
+        latencies, failures, probe, elapsed = login_round()
+        print(f"{app.password_hasher.workers:>7} {label:<6} {len(latencies) / elapsed:>10.1f} "
+              f"{percentile(latencies, 0.5):>8.0f} {percentile(latencies, 0.95):>8.0f} "
+              f"{percentile(probe, 0.5):>9.1f} {percentile(probe, 0.95):>9.1f} {len(failures):>6}")
+    with app.app.app_context():
+        upgraded = sum(1 for (password,) in app.db.session.execute(app.select(app.User.password))
+                       if not app.password_hasher.needs_rehash(password))
+    app.password_hasher.shutdown()
+    ok = not failures and upgraded == len(ids)
+    print(f"{'':>7} users on policy {app.password_hasher.method}: {upgraded}/{len(ids)}"
+          f"{'' if ok else '  FAIL'}")
+    sys.exit(0 if ok else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', default='0,1,2', help='Comma separated PASSWORD_HASH_WORKERS values.')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--method', default='scrypt', help='PASSWORD_HASH_METHOD (the policy).')
+    parser.add_argument('--stored', default=None, help='Method the users were stored with (default: the policy).')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run_child(args)
+
+    print(f"policy {args.method}, stored {args.stored or args.method}, {args.users} users, {args.threads} threads, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'round':<6} {'logins/s':>10} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'probe p50':>9} {'probe p95':>9} {'failed':>6}")
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers.split(','):
+            env = dict(os.environ, PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_METHOD=args.method, RATE_LIMIT='0',
+                       DATABASE_URL='sqlite:///' + os.path.join(tmp, f'logins-{workers}.db'))
+            child = [sys.executable, os.path.abspath(__file__), '--child', '--users', str(args.users),
+                     '--threads', str(args.threads), '--method', args.method]
+            if args.stored:
+                child += ['--stored', args.stored]
+            failed |= subprocess.run(child, env=env).returncode != 0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
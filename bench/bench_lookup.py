@@ -0,0 +1,60 @@
+"""Microbenchmark: student lookup via the ID index vs. the old boolean-mask scan.
+
+Usage:  python bench/bench_lookup.py [--repeat 2000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import app  # noqa: E402
+import dataset  # noqa: E402
+
+data = app.get_data()
+
+
+def mask_lookup(student_id):
+    # المسار القديم: مقارنة نصية على كل الصفوف + DataFrame جديد + to_dict
+    match = data.sheet1_df[data.sheet1_df['ID'] == student_id]
+    raw = match.iloc[0].to_dict() if not match.empty else None
+    rank_match = data.sheet2_df[data.sheet2_df['ID'] == student_id]
+    ranks = rank_match.iloc[0].to_dict() if not rank_match.empty else None
+    return raw, ranks
+
+
+def index_lookup(student_id):
+    record = data.student_index.get(student_id)
+    return (record.raw, record.ranks) if record is not None else (None, None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    ids = list(data.student_index)
+    if not ids:
+        sys.exit('No student data loaded.')
+    probe = [ids[i * len(ids) // 10] for i in range(10)]
+
+    for sid in probe:
+        old_raw, old_ranks = mask_lookup(sid)
+        new_raw, new_ranks = index_lookup(sid)
+        assert dict(new_raw).keys() == old_raw.keys(), sid
+
+    build = timeit.timeit(lambda: dataset.build_student_index(data.sheet1_df, data.sheet2_df), number=5) / 5
+    print(f"students indexed : {len(ids)}")
+    print(f"index build      : {build * 1e3:.1f} ms (once per data load)")
+    for name, fn in (('mask scan', mask_lookup), ('id index', index_lookup)):
+        t = timeit.timeit(lambda: [fn(sid) for sid in probe], number=args.repeat // len(probe))
+        per_call = t / (args.repeat // len(probe) * len(probe))
+        print(f"{name:<17}: {per_call * 1e6:9.2f} us/lookup")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Compare dataset load time and memory: CSV parsing vs. the binary snapshot.
+
+Each run happens in a fresh interpreter. RSS is measured after pandas/numpy are
+imported and again after ``dataset.load_dataset()``, so the delta is the cost of
+the data itself. "frames" is the parse/decode step alone, "full load" includes
+building the student index.
+
+Usage:  python bench/bench_snapshot.py [--runs 5] [--snapshot PATH]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, os, time
+import numpy, pandas
+
+def rss_kib():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+import dataset
+before = rss_kib()
+t0 = time.perf_counter()
+data = dataset.load_dataset()
+t_dataset = time.perf_counter()
+after = rss_kib()
+t1 = time.perf_counter()
+dataset.load_frames(data.version)
+t_frames = time.perf_counter()
+print(json.dumps({'frames_ms': (t_frames - t1) * 1e3, 'dataset_ms': (t_dataset - t0) * 1e3,
+                  'rss_delta_kib': after - before, 'students': len(data.student_index)}))
+"""
+
+
+def probe(snapshot):
+    env = dict(os.environ, DATA_SNAPSHOT=snapshot)
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    if 'Snapshot' in out.stdout:
+        print(out.stdout, file=sys.stderr)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--snapshot', default=None, help='Existing snapshot (default: build a fresh one).')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    import dataset
+
+    snapshot = args.snapshot
+    if snapshot is None:
+        snapshot = os.path.join(tempfile.mkdtemp(), 'data.snapshot')
+        dataset.build_snapshot(snapshot)
+    print(f"snapshot: {snapshot} ({os.path.getsize(snapshot) / 1024:.0f} KiB)\n")
+
+    print(f"{'source':<10}{'frames':>10}{'full load':>12}{'RSS delta':>12}")
+    for label, path in (('csv', ''), ('snapshot', snapshot)):
+        runs = [probe(path) for _ in range(args.runs)]
+        frames = statistics.median(r['frames_ms'] for r in runs)
+        total = statistics.median(r['dataset_ms'] for r in runs)
+        rss = statistics.median(r['rss_delta_kib'] for r in runs)
+        print(f"{label:<10}{frames:>8.1f}ms{total:>10.1f}ms{rss / 1024:>10.1f}MiB")
+
+
+if __name__ == '__main__':
+    main()
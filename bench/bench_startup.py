@@ -0,0 +1,111 @@
+"""Cold-start benchmark for the serverless entry point.
+
+Spawns a fresh interpreter per run and measures, for each path, the time to
+import ``app`` and the time until the first response is ready, plus a warm
+repeat. Also prints the heaviest imports from ``python -X importtime``.
+
+Usage:  python bench/bench_startup.py [--runs 5] [--max-login-ms 800]
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEED = r"""
+import app
+from werkzeug.security import generate_password_hash
+with app.app.app_context():
+    app.db.create_all()
+    app.db.session.add(app.User(student_id=STUDENT_ID, password=generate_password_hash('x'), has_paid=True))
+    app.db.session.commit()
+"""
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t_import = time.perf_counter()
+client = app.app.test_client()
+path = sys.argv[1]
+if path != '/login':
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+status = client.get(path).status_code
+t_first = time.perf_counter()
+client.get(path)
+t_warm = time.perf_counter()
+heavy = [m for m in ('pandas', 'matplotlib', 'numpy') if m in sys.modules]
+print(json.dumps({'status': status, 'import_ms': (t_import - t0) * 1e3,
+                  'first_ms': (t_first - t0) * 1e3, 'warm_ms': (t_warm - t_first) * 1e3,
+                  'heavy_modules': heavy}))
+"""
+
+
+def run(code, env, *args):
+    out = subprocess.run([sys.executable, '-c', code, *args], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return out.stdout.strip().splitlines()[-1] if out.stdout.strip() else ''
+
+
+def top_imports(env, limit):
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        if not name.startswith(' ') and '.' not in name.strip():
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--paths', nargs='+', default=['/login', '/'])
+    parser.add_argument('--max-login-ms', type=float, default=None,
+                        help='Fail if the median time-to-first-response for /login exceeds this.')
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'data1.csv'), encoding='utf-8-sig') as f:
+        student_id = next(csv.DictReader(f))['ID'].strip()
+
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    run(SEED.replace('STUDENT_ID', repr(student_id)), env)
+
+    results = {}
+    for path in args.paths:
+        samples = [json.loads(run(PROBE, env, path)) for _ in range(args.runs)]
+        results[path] = {
+            'status': samples[0]['status'],
+            'import_ms': statistics.median(s['import_ms'] for s in samples),
+            'first_ms': statistics.median(s['first_ms'] for s in samples),
+            'warm_ms': statistics.median(s['warm_ms'] for s in samples),
+            'heavy_modules': samples[0]['heavy_modules'],
+        }
+
+    print(f"{'path':<10}{'status':>7}{'import':>10}{'first':>10}{'warm':>10}  heavy modules loaded")
+    for path, r in results.items():
+        print(f"{path:<10}{r['status']:>7}{r['import_ms']:>8.0f}ms{r['first_ms']:>8.0f}ms"
+              f"{r['warm_ms']:>8.1f}ms  {', '.join(r['heavy_modules']) or '-'}")
+
+    print("\nheaviest top-level imports of `import app` (cumulative):")
+    for cumulative, name in top_imports(env, 10):
+        print(f"  {cumulative / 1e3:8.1f} ms  {name}")
+
+    login = results.get('/login')
+    if args.max_login_ms is not None and login and login['first_ms'] > args.max_login_ms:
+        sys.exit(f"/login cold start {login['first_ms']:.0f}ms exceeds budget {args.max_login_ms:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark: per-request template render time, recompiled vs compiled once.
+
+For each page/mode a real request is made once to capture the exact template
+context, then the same render is timed two ways inside a request context:
+
+  from_string  render_template_string(source)  (the old path, compiles every time)
+  loader       render_template(name)           (compiled once via the DictLoader)
+
+Usage:  python bench/bench_templates.py [--repeat 200] [--student 4]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from flask import render_template, render_template_string, template_rendered  # noqa: E402
+from flask_login import login_user  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import app  # noqa: E402
+
+# السياق اللي Flask و Flask-Login بيضيفوه لوحدهم وقت الرندر
+INJECTED = {'g', 'request', 'session', 'current_user', 'config', 'url_for', 'get_flashed_messages'}
+
+CASES = [
+    ('login', 'get', '/login', None),
+    ('search', 'get', '/', None),
+    ('need', 'post', '/?mode=need', {'target_percentage': '90'}),
+    ('distance', 'post', '/?mode=distance', {'target_rank': '10'}),
+    ('residency', 'get', '/residency?year=2025', None),
+    ('admin', 'get', '/admin', None),
+]
+
+
+def capture(client, method, url, form):
+    captured = []
+
+    def record(sender, template, context, **extra):
+        captured.append((template.name, {k: v for k, v in context.items() if k not in INJECTED}))
+
+    template_rendered.connect(record, app.app)
+    try:
+        response = getattr(client, method)(url, data=form)
+    finally:
+        template_rendered.disconnect(record, app.app)
+    if response.status_code != 200 or not captured:
+        raise SystemExit(f"{url}: status {response.status_code}, nothing rendered")
+    return captured[-1]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--student', default='4')
+    args = parser.parse_args()
+
+    with app.app.app_context():
+        app.db.create_all()
+        for student_id, is_admin in ((args.student, False), ('ADMIN', True)):
+            if not app.User.query.filter_by(student_id=student_id).first():
+                app.db.session.add(app.User(student_id=student_id, password=generate_password_hash('bench'),
+                                            has_paid=True, is_admin=is_admin))
+        app.db.session.commit()
+        users = {u.student_id: u for u in app.User.query.all()}
+
+    print(f"{'mode':<10} {'template':<15} {'from_string ms':>15} {'loader ms':>10} {'speedup':>8}")
+    for mode, method, url, form in CASES:
+        student_id = 'ADMIN' if mode == 'admin' else args.student
+        client = app.app.test_client()
+        if mode != 'login':
+            client.post('/login', data={'student_id': student_id, 'password': 'bench'})
+        name, context = capture(client, method, url, form)
+        source = app.TEMPLATES[name]
+
+        with app.app.test_request_context(url, method=method.upper(), data=form):
+            if mode != 'login':
+                login_user(app.db.session.get(app.User, users[student_id].id))
+            old = render_template_string(source, **context)
+            new = render_template(name, **context)
+            if old != new:
+                raise SystemExit(f"{mode}: loader output differs from from_string output")
+            before = timed(lambda: render_template_string(source, **context), args.repeat)
+            after = timed(lambda: render_template(name, **context), args.repeat)
+        print(f"{mode:<10} {name:<15} {before:>15.3f} {after:>10.3f} {before / after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
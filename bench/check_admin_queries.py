@@ -0,0 +1,89 @@
+"""Check: the admin payment queue costs the same number of queries at any length.
+
+Fills the queue with 1, 10, 100 and 1000 pending payments, counts the SQL
+statements a warm GET /admin issues, and asserts the count is constant and
+within --max-queries (no N+1 on req.user). Also walks every keyset page and
+asserts each pending payment is listed exactly once. Exits non-zero on
+failure.
+
+Usage:  python bench/check_admin_queries.py [--max-queries 2]
+"""
+import argparse
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import event  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import app  # noqa: E402
+
+queries = []
+
+
+def fill_queue(total):
+    with app.app.app_context():
+        app.Payment.query.delete()
+        app.User.query.filter(app.User.student_id != 'ADMIN').delete()
+        app.db.session.commit()
+        users = [app.User(student_id=f"Q{i}", password='x') for i in range(total)]
+        app.db.session.add_all(users)
+        app.db.session.flush()
+        # شوية Approved في النص عشان الفلترة تتختبر كمان
+        app.db.session.add_all(app.Payment(user_id=u.id, status='Approved' if i % 7 == 3 else 'Pending')
+                               for i, u in enumerate(users))
+        app.db.session.commit()
+        return app.Payment.query.filter_by(status='Pending').count()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-queries', type=int, default=2)
+    args = parser.parse_args()
+
+    with app.app.app_context():
+        app.create_tables()
+        app.db.session.add(app.User(student_id='ADMIN', password=generate_password_hash('pw'), is_admin=True, has_paid=True))
+        app.db.session.commit()
+        event.listen(app.db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: queries.append(statement))
+        indexed = {index.name for index in app.Payment.__table__.indexes}
+    print(f"Payment indexes: {sorted(indexed)}")
+
+    client = app.app.test_client()
+    client.post('/login', data={'student_id': 'ADMIN', 'password': 'pw'})
+    counts = {}
+    for total in (1, 10, 100, 1000):
+        pending = fill_queue(total)
+        client.get('/admin')  # warm: principal cache
+        queries.clear()
+        body = client.get('/admin').get_data(as_text=True)
+        counts[total] = len(queries)
+
+        seen, after = [], None
+        while True:
+            page = client.get('/admin' + (f'?after={after}' if after is not None else '')).get_data(as_text=True)
+            seen += re.findall(r'/approve/(\d+)"', page)
+            match = re.search(r'\?after=(\d+)"', page)
+            if not match:
+                break
+            after = match.group(1)
+        ok = len(seen) == len(set(seen)) == pending and f'Pending Requests ({pending})' in body
+        print(f"{'ok  ' if ok else 'FAIL'} {total:>5} payments, {pending:>4} pending: {counts[total]} queries, "
+              f"{len(seen)} listed across pages")
+        if not ok:
+            raise SystemExit(1)
+
+    flat = len(set(counts.values())) == 1 and max(counts.values()) <= args.max_queries
+    print(f"{'ok  ' if flat else 'FAIL'} queries per /admin page: {counts} (max {args.max_queries})")
+    if not flat:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Check: render spikes are queued or shed, cheap routes stay fast, login is rate limited.
+
+Runs with one render slot and a short queue (set before the app is
+imported), sends a burst of cold chart requests for different students and
+asserts that renders never overlap, the excess gets 503 with Retry-After,
+cached charts and /login keep answering during the burst, and the
+admitted/queued/shed counters add up. Then hammers the login POST from one
+IP and for one student ID and asserts the token buckets answer 429 with
+Retry-After before any password is checked, while the same student can
+still log in from another IP and correct passwords never use up the
+per-ID bucket. Exits non-zero on failure.
+
+Usage:  python bench/check_admission.py [--burst 24]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.update(RENDER_CONCURRENCY='1', RENDER_QUEUE='2', RENDER_QUEUE_TIMEOUT='1',
+                  PRERENDER_DIR=tempfile.mkdtemp(), CHART_CACHE_DIR='', RATE_LIMIT='1')
+
+import app  # noqa: E402
+
+overlap = {'now': 0, 'max': 0}
+lock = threading.Lock()
+
+
+def check(label, condition):
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def counting_render(render):
+    def wrapped(*args):
+        with lock:
+            overlap['now'] += 1
+            overlap['max'] = max(overlap['max'], overlap['now'])
+        try:
+            return render(*args)
+        finally:
+            with lock:
+                overlap['now'] -= 1
+    return wrapped
+
+
+def logged_in_client(user_id):
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--burst', type=int, default=24)
+    args = parser.parse_args()
+
+    data = app.get_data()
+    ids = [sid for sid, record in data.student_index.items() if app.has_chart(data, record, 'distribution')][:args.burst + 1]
+    with app.app.app_context():
+        app.create_tables()
+        app.db.session.execute(app.insert(app.User), [{'student_id': sid, 'password': 'x', 'has_paid': True} for sid in ids])
+        app.db.session.commit()
+        user_ids = {sid: uid for uid, sid in app.db.session.execute(app.select(app.User.id, app.User.student_id))}
+    app.render_chart = counting_render(app.render_chart)
+
+    warm = logged_in_client(user_ids[ids[-1]])
+    check('warm chart renders', warm.get('/chart/distribution.png').status_code == 200)
+
+    results, cheap = [], []
+    barrier = threading.Barrier(args.burst + 1)
+
+    def cold(sid):
+        client = logged_in_client(user_ids[sid])
+        barrier.wait()
+        response = client.get('/chart/distribution.png')
+        results.append((response.status_code, response.headers.get('Retry-After')))
+
+    def cheap_routes():
+        anonymous = app.app.test_client()
+        barrier.wait()
+        deadline = time.perf_counter() + 0.5
+        while time.perf_counter() < deadline:
+            for who, url in ((anonymous, '/login'), (warm, '/chart/distribution.png')):
+                started = time.perf_counter()
+                status = who.get(url).status_code
+                cheap.append((status, time.perf_counter() - started))
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=cold, args=(sid,)) for sid in ids[:args.burst]]
+    threads.append(threading.Thread(target=cheap_routes))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = app.admission.stats()
+    ok = sum(1 for status, _ in results if status == 200)
+    shed = [(status, retry) for status, retry in results if status == 503]
+    print(f"     burst of {args.burst}: {ok} rendered, {len(shed)} shed; {stats}")
+    check('at most one chart rendered at a time', overlap['max'] == 1)
+    check('every cold request rendered or got 503', ok + len(shed) == args.burst)
+    check('the excess was shed with Retry-After', shed and all(retry for _, retry in shed))
+    check('counters add up (admitted + shed = cold requests + warm-up)',
+          stats['admitted'] + stats['shed'] == args.burst + 1 and stats['shed'] == len(shed))
+    slowest = max(seconds for _, seconds in cheap) * 1000
+    check(f'cheap routes answered 200 during the burst ({len(cheap)} requests, slowest {slowest:.0f} ms)',
+          cheap and all(status == 200 for status, _ in cheap))
+
+    with app.app.app_context():
+        app.db.session.execute(app.update(app.User).where(app.User.student_id == ids[0])
+                               .values(password=app.password_hasher.hash('pw')))
+        app.db.session.commit()
+    verifies = app.password_hasher.verifies
+    client = app.app.test_client()
+    statuses = [client.post('/login', data={'student_id': ids[0], 'password': 'wrong'}).status_code
+                for _ in range(app.login_id_limiter.burst + 2)]
+    check(f'per-ID bucket: {statuses}', statuses.count(200) == app.login_id_limiter.burst and statuses[-1] == 429)
+    statuses = [client.post('/login', data={'student_id': sid, 'password': 'wrong'},
+                            environ_base={'REMOTE_ADDR': '10.0.0.9'}).status_code
+                for sid in ids[1:app.login_ip_limiter.burst + 3]]
+    response = client.post('/login', data={'student_id': ids[1], 'password': 'wrong'},
+                           environ_base={'REMOTE_ADDR': '10.0.0.9'})
+    check(f'per-IP bucket: {statuses + [response.status_code]}',
+          statuses.count(200) == app.login_ip_limiter.burst and response.status_code == 429
+          and response.headers.get('Retry-After'))
+    check('rate-limited attempts never reached the password hasher',
+          app.password_hasher.verifies - verifies == app.login_id_limiter.burst + app.login_ip_limiter.burst)
+    other = client.post('/login', data={'student_id': ids[2], 'password': 'wrong'}, environ_base={'REMOTE_ADDR': '10.0.0.10'})
+    check('another IP and ID are unaffected', other.status_code == 200)
+    # الـ ID اللي اتقفل فوق من 127.0.0.1 لسه بيدخل من جهازه هو
+    victim = app.app.test_client().post('/login', data={'student_id': ids[0], 'password': 'pw'},
+                                        environ_base={'REMOTE_ADDR': '10.0.0.11'})
+    check('wrong passwords from one IP do not lock the student out elsewhere', victim.status_code == 302)
+    statuses = [app.app.test_client().post('/login', data={'student_id': ids[0], 'password': 'pw'},
+                                           environ_base={'REMOTE_ADDR': '10.0.0.12'}).status_code
+                for _ in range(app.login_id_limiter.burst + 2)]
+    check(f'correct passwords never use up the per-ID bucket: {statuses}', statuses == [302] * len(statuses))
+    app.password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Check: bulk pre-approval of 1,000 IDs is one transaction and well under a second.
+
+Seeds a mix of registered (paid and unpaid, some with a pending payment),
+already whitelisted and new IDs, pads the list with unknown IDs and one
+repeat, posts them as a CSV upload to
+/admin/preapprove/bulk and asserts every per-ID outcome, the resulting rows,
+that the cached principals of activated students were dropped, that the
+statement count does not grow with the list, and the elapsed time. Exits
+non-zero on failure.
+
+Usage:  python bench/check_bulk_preapprove.py [--n 1000] [--max-seconds 1.0]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import event  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import app  # noqa: E402
+
+queries = []
+
+
+def check(label, condition):
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def seed(cohort):
+    """Quarter registered unpaid (half with a pending payment), an eighth paid, an eighth whitelisted."""
+    app.Payment.query.delete()
+    app.PreApproved.query.delete()
+    app.User.query.filter(app.User.student_id != 'ADMIN').delete()
+    app.db.session.commit()
+    expected = {}
+    for i, sid in enumerate(cohort):
+        kind = i % 8
+        if kind in (0, 1):
+            user = app.User(student_id=sid, password='x')
+            app.db.session.add(user)
+            if kind == 0:
+                app.db.session.flush()
+                app.db.session.add(app.Payment(user_id=user.id))
+            expected[sid] = 'activated'
+        elif kind == 2:
+            app.db.session.add(app.User(student_id=sid, password='x', has_paid=True))
+            expected[sid] = 'already_active'
+        elif kind == 3:
+            app.db.session.add(app.PreApproved(student_id=sid))
+            expected[sid] = 'already_whitelisted'
+        else:
+            expected[sid] = 'preapproved'
+    app.db.session.commit()
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=1000)
+    parser.add_argument('--max-seconds', type=float, default=1.0)
+    args = parser.parse_args()
+
+    with app.app.app_context():
+        app.create_tables()
+        app.db.session.add(app.User(student_id='ADMIN', password=generate_password_hash('pw'), is_admin=True, has_paid=True))
+        app.db.session.commit()
+        event.listen(app.db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: queries.append(statement))
+    client = app.app.test_client()
+    client.post('/login', data={'student_id': 'ADMIN', 'password': 'pw'})
+
+    counts = {}
+    for n in sorted({10, args.n}):
+        # الدفعة كلها ~930 طالب، فالباقي لحد n بيتكمل بـ IDs مش موجودة (invalid)
+        cohort = list(app.get_data().student_index)[:n - 1]
+        unknown = [f'NOT-A-STUDENT-{i}' for i in range(n - 1 - len(cohort))]
+        with app.app.app_context():
+            expected = seed(cohort)
+            activated_ids = [u.id for u in app.User.query.filter(app.User.student_id.in_(
+                [sid for sid, outcome in expected.items() if outcome == 'activated']))]
+        for uid in activated_ids:
+            app.user_cache.put(uid, 'stale')
+        ids = cohort + unknown + [cohort[0]]
+        expected.update(dict.fromkeys(unknown, 'invalid'))
+        upload = 'ID,Name\n' + ''.join(f'{sid},Student {i}\n' for i, sid in enumerate(ids))
+
+        queries.clear()
+        started = time.perf_counter()
+        response = client.post('/admin/preapprove/bulk?format=json',
+                               data={'file': (io.BytesIO(upload.encode()), 'ids.csv')})
+        elapsed = time.perf_counter() - started
+        counts[n] = sum(1 for sql in queries if not sql.lstrip().upper().startswith('SELECT'))
+        check(f'{n} IDs: status 200', response.status_code == 200)
+        report = response.get_json()
+        outcomes = [(r['student_id'], r['outcome']) for r in report['results']]
+        check(f'{n} IDs: one outcome per submitted ID, in order', [sid for sid, _ in outcomes] == ids)
+        check(f'{n} IDs: every outcome as expected',
+              all(outcome == expected[sid] for sid, outcome in outcomes[:-1]) and outcomes[-1][1] == 'duplicate')
+
+        with app.app.app_context():
+            unpaid = app.User.query.filter_by(has_paid=False).count()
+            pending = app.Payment.query.filter_by(status='Pending').count()
+            whitelisted = app.PreApproved.query.count()
+        want_whitelisted = sum(1 for o in expected.values() if o in ('preapproved', 'already_whitelisted'))
+        check(f'{n} IDs: no unpaid users, no pending payments, {want_whitelisted} whitelisted',
+              unpaid == 0 and pending == 0 and whitelisted == want_whitelisted)
+        check(f'{n} IDs: activated principals dropped from the cache',
+              all(app.user_cache.get(uid) is None for uid in activated_ids))
+        check(f'{n} IDs: {elapsed * 1000:.0f} ms (max {args.max_seconds * 1000:.0f} ms)', elapsed <= args.max_seconds)
+        print(f"     {report['counts']}, payments_approved={report['payments_approved']}")
+
+    chunks = -(-args.n // app.BULK_CHUNK_SIZE)
+    check(f'write statements per request: {counts} (bounded by chunks, not IDs)',
+          max(counts.values()) <= 4 * chunks + 2)
+
+
+if __name__ == '__main__':
+    main()
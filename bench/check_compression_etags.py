@@ -0,0 +1,65 @@
+"""Check: compressed pages keep strong ETags and still revalidate to 304.
+
+Logs a paid student in and, for each encoding the middleware supports plus
+identity, fetches / and asserts that the 200 carries a strong ETag (with the
+encoding as a suffix when compressed), that sending it back as
+If-None-Match answers 304 without rendering, and that the 304 repeats the
+exact ETag of the 200. Exits non-zero on the first failure.
+
+Usage:  python bench/check_compression_etags.py
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ['RATE_LIMIT'] = '0'
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import app  # noqa: E402
+import compression  # noqa: E402
+
+STUDENT = '4'
+
+
+def check(label, condition):
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def main():
+    if not isinstance(app.app.wsgi_app, compression.CompressionMiddleware):
+        raise SystemExit('compression is disabled (COMPRESS_RESPONSES=0)')
+    with app.app.app_context():
+        app.db.create_all()
+        app.User.query.filter_by(student_id=STUDENT).delete()
+        app.db.session.add(app.User(student_id=STUDENT, password=generate_password_hash('pw'), has_paid=True))
+        app.db.session.commit()
+    client = app.app.test_client()
+    client.post('/login', data={'student_id': STUDENT, 'password': 'pw'})
+
+    for coding in compression.supported_encodings() + (None,):
+        name = coding or 'identity'
+        headers = {'Accept-Encoding': coding or 'identity'}
+        response = client.get('/', headers=headers)
+        etag = response.headers.get('ETag', '')
+        check(f"{name}: 200 with Content-Encoding {response.headers.get('Content-Encoding')}",
+              response.status_code == 200 and response.headers.get('Content-Encoding') == coding)
+        check(f"{name}: strong ETag {etag}", etag.startswith('"') and (coding is None or etag.endswith(f'-{coding}"')))
+
+        misses = app.response_cache.misses
+        revalidated = client.get('/', headers=dict(headers, **{'If-None-Match': etag}))
+        check(f"{name}: If-None-Match answers 304", revalidated.status_code == 304)
+        check(f"{name}: the 304 repeats the ETag of the 200", revalidated.headers.get('ETag') == etag)
+        check(f"{name}: nothing was rendered for the 304", app.response_cache.misses == misses)
+
+    response = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"stale-gzip"'})
+    check('a stale ETag still gets the full page', response.status_code == 200)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Check: the disk tier of the response/chart caches never serves stale pages.
+
+Runs the app with RESPONSE_CACHE_DIR and CHART_CACHE_DIR in a temporary
+directory and asserts that:
+
+  - files left from another data version are deleted on the first load
+  - a cached page is read back from disk after the memory tier is dropped
+  - invalidating a student (approve / preapprove) deletes their files, so the
+    next request renders again instead of reading the old page from disk
+  - a data swap deletes the files of the old version
+  - the disk tier stays under its size limit
+
+Exits non-zero on the first failure.
+
+Usage:  python bench/check_response_cache_disk.py
+"""
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ['RATE_LIMIT'] = '0'
+TMP = tempfile.TemporaryDirectory()
+os.environ['RESPONSE_CACHE_DIR'] = os.path.join(TMP.name, 'responses')
+os.environ['CHART_CACHE_DIR'] = os.path.join(TMP.name, 'charts')
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import app  # noqa: E402
+from cache import BytesCache  # noqa: E402
+
+STUDENT = '4'
+
+
+def check(label, condition):
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def files(cache):
+    return sorted(entry.name for entry in os.scandir(cache.disk_dir))
+
+
+def main():
+    # ملف من نسخة داتا قديمة، كأنه فاضل من تشغيل قبل كده
+    app.response_cache._write_disk((STUDENT, 'search', False, 0, 'old-assets', 'old-version'), b'<html>old</html>')
+    check('stale file from an old data version is on disk', len(files(app.response_cache)) == 1)
+    data = app.get_data()
+    check('first load deletes files from other data versions', files(app.response_cache) == [])
+
+    with app.app.app_context():
+        app.db.create_all()
+        app.db.session.add(app.User(student_id=STUDENT, password=generate_password_hash('pw'), has_paid=True))
+        app.db.session.commit()
+    client = app.app.test_client()
+    client.post('/login', data={'student_id': STUDENT, 'password': 'pw'})
+
+    check('GET / renders', client.get('/').status_code == 200)
+    check('the page is written to disk', len(files(app.response_cache)) == 1)
+    app.response_cache.clear()
+    disk_hits = app.response_cache.disk_hits
+    check('GET / after a restart', client.get('/').status_code == 200)
+    check('the page is read back from disk', app.response_cache.disk_hits == disk_hits + 1)
+
+    app.invalidate_user_responses(STUDENT)
+    check('invalidating the student deletes the file', files(app.response_cache) == [])
+    app.response_cache.clear()
+    misses = app.response_cache.misses
+    disk_hits = app.response_cache.disk_hits
+    check('GET / after the invalidation', client.get('/').status_code == 200)
+    check('the page is rendered again, not read from disk',
+          app.response_cache.misses == misses + 1 and app.response_cache.disk_hits == disk_hits)
+
+    check('the new page is on disk again', len(files(app.response_cache)) == 1)
+    app._on_data_swap(data, SimpleNamespace(version='next-version'))
+    check('a data swap deletes the files of the old version', files(app.response_cache) == [])
+
+    capped = BytesCache(max_bytes=1024, disk_dir=os.path.join(TMP.name, 'capped'), suffix='.bin', disk_max_bytes=64 * 1024)
+    for i in range(200):
+        capped.get_or_render(('student', i, 'v1'), lambda: b'x' * 1024)
+    on_disk = sum(entry.stat().st_size for entry in os.scandir(capped.disk_dir))
+    stats = capped.stats()
+    check(f"disk tier stays under its limit ({on_disk} <= {capped.disk_max_bytes} bytes)", on_disk <= capped.disk_max_bytes)
+    check(f"old files were evicted ({stats['disk_evictions']})", stats['disk_evictions'] > 0)
+    check('the size estimate matches the directory', stats['disk_bytes'] == on_disk)
+    check('the newest entry is still on disk', capped._read_disk(('student', 199, 'v1')) == b'x' * 1024)
+    TMP.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Check: cached user principals never hide an approval, revoke or reset.
+
+Walks a student through payment -> admin approval -> revoke -> password
+reset and asserts every change is visible on the very next request, while
+repeat requests in between load the user without touching the database.
+Exits non-zero on the first failure.
+
+Usage:  python bench/check_user_cache.py
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('USER_CACHE_TTL', '3600')  # الـ TTL مش هو اللي بيخلي التغيير يبان
+
+from sqlalchemy import event  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import app  # noqa: E402
+
+STUDENT = '4'
+queries = []
+
+
+def check(label, condition):
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def user_queries(client, url):
+    queries.clear()
+    response = client.get(url)
+    return response, sum(1 for sql in queries if 'FROM user' in sql)
+
+
+def main():
+    with app.app.app_context():
+        app.db.create_all()
+        event.listen(app.db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: queries.append(statement))
+        for student_id, is_admin in ((STUDENT, False), ('ADMIN', True)):
+            app.User.query.filter_by(student_id=student_id).delete()
+            app.db.session.add(app.User(student_id=student_id, password=generate_password_hash('pw'),
+                                        is_admin=is_admin, has_paid=is_admin))
+        app.db.session.commit()
+        app.user_cache.clear()
+
+    student = app.app.test_client()
+    admin = app.app.test_client()
+    student.post('/login', data={'student_id': STUDENT, 'password': 'pw'})
+    admin.post('/login', data={'student_id': 'ADMIN', 'password': 'pw'})
+
+    response, n = user_queries(student, '/')
+    check('unpaid student is sent to /payment', response.status_code == 302 and '/payment' in response.location)
+    response, n = user_queries(student, '/payment')
+    check('repeat request loads the user from the cache (0 user queries)', response.status_code == 200 and n == 0)
+
+    student.post('/payment')
+    with app.app.app_context():
+        user_id = app.User.query.filter_by(student_id=STUDENT).first().id
+        req = app.Payment.query.filter_by(user_id=user_id, status='Pending').first()
+    admin.get(f'/approve/{req.id}')
+    response, n = user_queries(student, '/')
+    check('approved student sees results on the next request', response.status_code == 200)
+
+    with app.app.app_context():
+        user = app.db.session.get(app.User, user_id)
+        user.has_paid = False
+        app.db.session.commit()
+    response, n = user_queries(student, '/')
+    check('revoked student (any committed change) is sent to /payment on the next request',
+          response.status_code == 302 and '/payment' in response.location)
+
+    admin.post('/admin/preapprove', data={'student_id': STUDENT})
+    response, n = user_queries(student, '/')
+    check('pre-approved existing student sees results on the next request', response.status_code == 200)
+
+    user_queries(student, '/')
+    admin.post('/admin/reset_password', data={'student_id': STUDENT})
+    response, n = user_queries(student, '/')
+    check('password reset drops the cached principal (user reloaded from DB)', n == 1)
+
+    with app.app.app_context():
+        user = app.db.session.get(app.User, user_id)
+        user.has_paid = False
+        app.db.session.rollback()
+    response, n = user_queries(student, '/')
+    check('a rolled-back change keeps the cached principal', response.status_code == 200 and n == 0)
+
+    print(app.user_cache.stats())
+
+
+if __name__ == '__main__':
+    main()
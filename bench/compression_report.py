@@ -0,0 +1,113 @@
+"""Report: bytes saved and CPU spent by response compression, per route.
+
+Each route is fetched once uncompressed, then once per encoding through the
+real middleware (decoded bodies must match). CPU cost is the median
+process time of compressing that body with the middleware's settings;
+static CSS shows whether a precompressed sibling from `flask build-assets`
+was served instead (no per-request CPU at all).
+
+Usage:  python bench/compression_report.py [--repeat 20] [--student 4]
+"""
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import app  # noqa: E402
+import compression  # noqa: E402
+
+
+def decode(response):
+    coding = response.headers.get('Content-Encoding')
+    if coding == 'gzip':
+        return gzip.decompress(response.data)
+    if coding == 'br':
+        import brotli
+        return brotli.decompress(response.data)
+    return response.data
+
+
+def cpu_ms(body, coding, repeat):
+    middleware = app.app.wsgi_app
+    samples = []
+    for _ in range(repeat):
+        started = time.process_time()
+        stream = compression.compressor(coding, middleware.gzip_level, middleware.brotli_quality)
+        stream.compress(body)
+        stream.flush()
+        samples.append((time.process_time() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--student', default='4')
+    args = parser.parse_args()
+
+    if not isinstance(app.app.wsgi_app, compression.CompressionMiddleware):
+        raise SystemExit('compression is disabled (COMPRESS_RESPONSES=0)')
+    with app.app.app_context():
+        app.db.create_all()
+        if not app.User.query.filter_by(student_id=args.student).first():
+            app.db.session.add(app.User(student_id=args.student, password=generate_password_hash('bench'), has_paid=True))
+            app.db.session.commit()
+
+    anonymous = app.app.test_client()
+    client = app.app.test_client()
+    client.post('/login', data={'student_id': args.student, 'password': 'bench'})
+    routes = [
+        (anonymous, '/login'),
+        (client, '/'),
+        (client, '/?mode=need'),
+        (client, '/?mode=distance'),
+        (client, '/residency?year=2024'),
+        (client, '/residency?year=2025'),
+        (client, '/api/need-curve'),
+        (client, '/api/residency-prediction'),
+        (client, '/chart/distribution.png'),
+        (client, '/static/' + app.asset_manifest.path_for('css/main.css')),
+    ]
+    encodings = compression.supported_encodings()
+
+    print(f"{'route':<34} {'raw B':>8} " + ' '.join(f"{c + ' B':>8} {c + ' %':>6} {c + ' ms':>7}" for c in encodings))
+    total_raw, total = 0, {c: 0 for c in encodings}
+    for who, url in routes:
+        raw = who.get(url, headers={'Accept-Encoding': 'identity'})
+        if raw.status_code != 200:
+            print(f"{url:<34} status {raw.status_code}, skipped")
+            continue
+        cells = []
+        for coding in encodings:
+            response = who.get(url, headers={'Accept-Encoding': coding})
+            if decode(response) != raw.data:
+                raise SystemExit(f"{url}: {coding} body does not decode to the identity body")
+            sent = len(response.data)
+            if response.headers.get('Content-Encoding') != coding:
+                cost = '  skip'
+            elif url.startswith('/static/') and response.headers.get('Content-Length') == str(sent) \
+                    and not response.headers.get('ETag', '').endswith(f'-{coding}"'):
+                cost = '   pre'
+            else:
+                cost = f"{cpu_ms(raw.data, coding, args.repeat):7.2f}"
+            saved = (1 - sent / len(raw.data)) * 100 if raw.data else 0.0
+            cells.append(f"{sent:>8} {saved:>5.1f}% {cost:>7}")
+            total[coding] += sent
+        total_raw += len(raw.data)
+        print(f"{url[:34]:<34} {len(raw.data):>8} " + ' '.join(cells))
+    print(f"{'total':<34} {total_raw:>8} " + ' '.join(
+        f"{total[c]:>8} {(1 - total[c] / total_raw) * 100:>5.1f}% {'':>7}" for c in encodings))
+    print("ms = median CPU to compress the body per request; pre = precompressed file served; skip = passed through")
+
+
+if __name__ == '__main__':
+    main()
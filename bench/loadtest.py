@@ -0,0 +1,305 @@
+"""Load test: replay a results-day traffic mix against a local server.
+
+Seeds --users paid students (IDs from data1.csv) and an admin into a
+temporary SQLite database, starts the app on a threaded local HTTP server
+and runs the scenarios on --concurrency client threads:
+
+  returning  login, search page + charts, need and distance POSTs, residency
+             for every year
+  new        register, login, payment page, payment request (--new-users of
+             them, IDs not seeded)
+  admin      polls /admin and approves pending payments until the run ends
+
+Every request is timed on the client side. The JSON report has throughput
+and p50/p95/p99/max latency per route and overall, plus the run settings
+and git commit, so reports from different runs can be compared
+(--compare old.json prints the p95 change per route). No external services
+are needed. Rate limiting is off unless --rate-limit is given, because every
+client shares 127.0.0.1.
+
+Usage:  python bench/loadtest.py [--users 200] [--new-users 50] [--concurrency 16]
+                                 [--out report.json] [--compare old.json] [--rate-limit]
+"""
+import argparse
+import gzip
+import json
+import logging
+import math
+import os
+import platform
+import queue
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+PASSWORD = 'loadtest-pw'
+
+
+def decode(body, coding):
+    if coding == 'gzip':
+        return gzip.decompress(body)
+    if coding == 'br':
+        import brotli
+        return brotli.decompress(body)
+    return body
+
+
+class Client:
+    """One browser: its own cookies, every request timed and recorded under ``label``."""
+
+    def __init__(self, port, record):
+        self.port = port
+        self.record = record
+        self.cookies = {}
+
+    def request(self, label, method, path, form=None):
+        headers = {'Accept-Encoding': 'gzip, br'}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        conn = HTTPConnection('127.0.0.1', self.port, timeout=120)
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = decode(response.read(), response.getheader('Content-Encoding'))
+            status = response.status
+            for header in response.headers.get_all('Set-Cookie') or ():
+                for name, morsel in SimpleCookie(header).items():
+                    self.cookies[name] = morsel.value
+        except OSError:
+            data, status = b'', 599
+        finally:
+            conn.close()
+        # الوقت شامل فك الضغط، زي المتصفح
+        self.record(label, status, time.perf_counter() - started)
+        return status, data
+
+
+def returning_student(client, sid, charts, years):
+    client.request('POST /login', 'POST', '/login', {'student_id': sid, 'password': PASSWORD})
+    client.request('GET /', 'GET', '/')
+    for kind in charts:
+        client.request('GET /chart/<kind>.png', 'GET', f'/chart/{kind}.png')
+    client.request('GET /?mode=need', 'GET', '/?mode=need')
+    client.request('POST /?mode=need', 'POST', '/?mode=need', {'target_percentage': '85'})
+    client.request('POST /?mode=distance', 'POST', '/?mode=distance', {'target_rank': '50'})
+    for year in years:
+        client.request('GET /residency', 'GET', f'/residency?year={year}')
+
+
+def new_student(client, sid):
+    client.request('POST /register', 'POST', '/register', {'student_id': sid, 'password': PASSWORD})
+    client.request('POST /login', 'POST', '/login', {'student_id': sid, 'password': PASSWORD})
+    client.request('GET /payment', 'GET', '/payment')
+    client.request('POST /payment', 'POST', '/payment', {})
+
+
+def admin_loop(client, done, approved):
+    client.request('POST /login', 'POST', '/login', {'student_id': 'ADMIN', 'password': PASSWORD})
+    while True:
+        finished = done.is_set()
+        status, page = client.request('GET /admin', 'GET', '/admin')
+        for req_id in re.findall(rb'/approve/(\d+)"', page)[:10]:
+            client.request('GET /approve/<id>', 'GET', f'/approve/{req_id.decode()}')
+            approved.append(req_id)
+        if finished:
+            return
+        done.wait(0.25)
+
+
+def percentile(sorted_samples, q):
+    if not sorted_samples:
+        return None
+    return sorted_samples[max(0, math.ceil(q * len(sorted_samples)) - 1)]
+
+
+def summarize(samples, statuses, elapsed):
+    ordered = sorted(samples)
+    ms = lambda v: round(v * 1000, 1) if v is not None else None  # noqa: E731
+    errors = sum(n for status, n in statuses.items() if status >= 400)
+    return {
+        'count': len(ordered),
+        'errors': errors,
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'throughput_rps': round(len(ordered) / elapsed, 2) if elapsed else None,
+        'mean_ms': ms(sum(ordered) / len(ordered)) if ordered else None,
+        'p50_ms': ms(percentile(ordered, 0.50)),
+        'p95_ms': ms(percentile(ordered, 0.95)),
+        'p99_ms': ms(percentile(ordered, 0.99)),
+        'max_ms': ms(ordered[-1] if ordered else None),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(report, previous=None, out=sys.stderr):
+    print(f"{'route':<24} {'count':>6} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+          + (f" {'p95 vs old':>11}" if previous else ''), file=out)
+    rows = list(report['routes'].items()) + [('total', report['total'])]
+    for label, row in rows:
+        line = (f"{label:<24} {row['count']:>6} {row['errors']:>5} {row['throughput_rps'] or 0:>8.1f} "
+                f"{row['p50_ms'] or 0:>8.1f} {row['p95_ms'] or 0:>8.1f} {row['p99_ms'] or 0:>8.1f} {row['max_ms'] or 0:>8.1f}")
+        if previous:
+            old = previous['total'] if label == 'total' else previous.get('routes', {}).get(label)
+            if old and old.get('p95_ms') and row['p95_ms'] is not None:
+                line += f" {(row['p95_ms'] / old['p95_ms'] - 1) * 100:>+10.0f}%"
+            else:
+                line += f" {'new':>11}"
+        print(line, file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=200, help='Registered, paid students (returning scenario).')
+    parser.add_argument('--new-users', type=int, default=50, help='Unregistered students (register + payment).')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--no-admin', action='store_true', help='Skip the admin approval loop.')
+    parser.add_argument('--rate-limit', action='store_true', help='Keep the login/register rate limits on.')
+    parser.add_argument('--out', default=None, help='Write the JSON report here (default: stdout).')
+    parser.add_argument('--compare', default=None, help='Earlier JSON report to compare p95 against.')
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp.name, 'loadtest.db')
+    os.environ['RATE_LIMIT'] = '1' if args.rate_limit else '0'
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    from werkzeug.security import generate_password_hash
+    from werkzeug.serving import make_server
+
+    import app
+
+    data = app.get_data()
+    cohort = [str(sid).strip() for sid in data.sheet1_df['ID'] if str(sid).strip() in data.student_index]
+    if args.users + args.new_users > len(cohort):
+        raise SystemExit(f"data1.csv has {len(cohort)} IDs, asked for {args.users} + {args.new_users}")
+    returning_ids, new_ids = cohort[:args.users], cohort[args.users:args.users + args.new_users]
+    years = list(data.residency)
+
+    # hash واحد لكل المستخدمين: الـ seed مش جزء من القياس، والـ verify بنفس التكلفة
+    stored = generate_password_hash(PASSWORD, method=app.password_hasher.method, salt_length=app.password_hasher.salt_length)
+    with app.app.app_context():
+        app.create_tables()
+        app.db.session.execute(app.insert(app.User), [{'student_id': sid, 'password': stored, 'has_paid': True}
+                                                      for sid in returning_ids]
+                               + [{'student_id': 'ADMIN', 'password': stored, 'is_admin': True, 'has_paid': True}])
+        app.db.session.commit()
+
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True).start()
+    port = server.server_port
+
+    samples, statuses = defaultdict(list), defaultdict(Counter)
+    lock = threading.Lock()
+
+    def record(label, status, seconds):
+        with lock:
+            samples[label].append(seconds)
+            statuses[label][status] += 1
+
+    jobs = queue.Queue()
+    # الاتنين متلخبطين عشان الـ register والـ login يحصلوا في نفس الوقت زي يوم النتيجة
+    mixed = [(i / len(returning_ids), 'returning', sid) for i, sid in enumerate(returning_ids)]
+    mixed += [(i / len(new_ids), 'new', sid) for i, sid in enumerate(new_ids)]
+    for _, kind, sid in sorted(mixed):
+        jobs.put((kind, sid))
+    completed = Counter()
+
+    def worker():
+        while True:
+            try:
+                kind, sid = jobs.get_nowait()
+            except queue.Empty:
+                return
+            client = Client(port, record)
+            if kind == 'returning':
+                student = data.student_index[sid]
+                charts = [chart for chart in app.CHART_KINDS if app.has_chart(data, student, chart)]
+                returning_student(client, sid, charts, years)
+            else:
+                new_student(client, sid)
+            with lock:
+                completed[kind] += 1
+
+    done, approved = threading.Event(), []
+    admin = None if args.no_admin else threading.Thread(target=admin_loop, args=(Client(port, record), done, approved))
+    started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    started = time.perf_counter()
+    if admin:
+        admin.start()
+    workers = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    if admin:
+        admin.join()
+    server.shutdown()
+    app.password_hasher.shutdown()
+
+    all_samples = [s for label in samples for s in samples[label]]
+    all_statuses = sum(statuses.values(), Counter())
+    report = {
+        'meta': {
+            'started_at': started_at,
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'users': args.users,
+            'new_users': args.new_users,
+            'concurrency': args.concurrency,
+            'admin': admin is not None,
+            'rate_limit': os.environ['RATE_LIMIT'] != '0',
+            'db_profile': app.DB_PROFILE,
+            'password_hash': app.password_hasher.method,
+            'password_workers': app.password_hasher.workers,
+            'render_concurrency': app.admission.max_concurrent,
+        },
+        'scenarios': {'returning': completed['returning'], 'new': completed['new'], 'approved': len(approved)},
+        'elapsed_s': round(elapsed, 2),
+        'total': summarize(all_samples, all_statuses, elapsed),
+        'routes': {label: summarize(samples[label], statuses[label], elapsed) for label in sorted(samples)},
+        'admission': app.admission.stats(),
+    }
+    tmp.cleanup()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+    print_table(report, previous)
+    print(f"{report['elapsed_s']}s, scenarios {report['scenarios']}, commit {report['meta']['git_commit']}", file=sys.stderr)
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Microbenchmarks: each hot path of main() and residency_page() on its own.
+
+Pure paths (record lookup, value formatting, percentiles, the two plots, need
+and distance math, residency filtering, main.html render) are called directly
+on the loaded dataset; the route cases go through the app's test client as a
+logged-in, paid student. Every case is timed with timeit (GC off,
+auto-ranged loop count) and the best of --repeat runs per call is compared
+with the committed bench/baseline.json. A case over the threshold is
+re-measured up to --confirm times (keeping its best) so one noisy run does
+not fail the suite. Exits non-zero when any case stays slower than its
+baseline by more than --threshold percent. After an intended change,
+re-record the baseline on the reference machine with --update.
+
+Usage:  python bench/microbench.py [--threshold 25] [--repeat 5] [--only plot]
+        python bench/microbench.py --update
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('RATE_LIMIT', '0')
+
+from flask import render_template  # noqa: E402
+from flask_login import login_user  # noqa: E402
+
+import app  # noqa: E402
+import charts  # noqa: E402
+import dataset  # noqa: E402
+
+BASELINE = os.path.join(ROOT, 'bench', 'baseline.json')
+
+
+def pick_student(data):
+    # طالب عنده الرسمتين ورتبة، عشان كل الـ paths تشتغل بجد
+    for student_id, record in data.student_index.items():
+        if record.total is not None and all(app.has_chart(data, record, kind) for kind in app.CHART_KINDS):
+            return student_id, record
+    raise SystemExit('no student with both charts in the dataset')
+
+
+def build_cases(data, student_id, record):
+    with app.app.app_context():
+        app.create_tables()
+        user = app.User(student_id=student_id, password='x', has_paid=True)
+        app.db.session.add(user)
+        app.db.session.commit()
+        principal = app.UserPrincipal(user)
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(principal.id)
+        session['_fresh'] = True
+
+    year = list(data.residency)[0]
+    index = data.residency[year]
+    specialty = next(iter(index.by_specialty))
+
+    def residency_filter():
+        positions = index.query(specialty, None, 1, None)
+        rows = [index.rows[i] for i in positions[:app.RESIDENCY_PER_PAGE]]
+        return rows, index.status_counts.get('بوست', 0), index.status_counts.get('بدون بوست', 0)
+
+    def distance_ranking():
+        rank = data.rank_index.rank_of(record.total)
+        target = data.rank_index.score_at(50)
+        return rank, target, data.rank_index.points_to(record.total, app.RANK_MILESTONES)
+
+    def template_main():
+        with app.app.test_request_context('/'):
+            login_user(principal)
+            return render_template('main.html', mode='search', result=record.result, plot_url='/chart/distribution.png',
+                                   rank_progress_url='/chart/rank-progress.png', percentile=50,
+                                   percentiles=data.percentiles.for_student(student_id),
+                                   need_result=None, need_curve=None, distance_result=None)
+
+    def route(method, url, **form):
+        def call():
+            response = client.open(url, method=method, data=form or None)
+            assert response.status_code == 200, (url, response.status_code)
+        return call
+
+    return {
+        'record_lookup': lambda: data.student_index.get(student_id),
+        'value_formatting': lambda: dataset.format_record(record.raw),
+        'percentile': lambda: data.percentiles.for_student(student_id),
+        'plot1_distribution': lambda: charts.render_distribution(data.total_scores, record.total, app.CURRENT_TOTAL_MAX),
+        'plot2_rank_progress': lambda: charts.render_rank_progress(record.ranks),
+        'need_math': lambda: dataset.need_curve(data.rank_index, record.total, app.CURRENT_TOTAL_MAX,
+                                                app.FINAL_TOTAL_MAX, app.REMAINING_MAX),
+        'distance_ranking': distance_ranking,
+        'residency_filter': residency_filter,
+        'template_main': template_main,
+        # الـ POST مش بيتكاش، فده render كامل للصفحة كل مرة
+        'route_search': route('POST', '/'),
+        'route_need': route('POST', '/?mode=need', target_percentage='85'),
+        'route_distance': route('POST', '/?mode=distance', target_rank='50'),
+        'route_residency': route('GET', f'/residency?year={year}'),
+    }
+
+
+def measure(fn, repeat):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return min(runs) * 1e6, sorted(runs)[len(runs) // 2] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threshold', type=float, default=25.0, help='Allowed slowdown in percent.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--confirm', type=int, default=2, help='Re-measure an apparent regression this many times.')
+    parser.add_argument('--only', default=None, help='Run the cases whose name contains this.')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--update', action='store_true', help='Record the results as the new baseline.')
+    args = parser.parse_args()
+
+    data = app.get_data()
+    student_id, record = pick_student(data)
+    cases = build_cases(data, student_id, record)
+    if args.only:
+        cases = {name: fn for name, fn in cases.items() if args.only in name}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        meta = baseline.get('meta', {})
+        if (meta.get('python'), meta.get('cpus')) != (platform.python_version(), os.cpu_count()):
+            print(f"note: baseline recorded on python {meta.get('python')} / {meta.get('cpus')} CPUs, "
+                  f"this is {platform.python_version()} / {os.cpu_count()} CPUs")
+
+    print(f"{'case':<22} {'best us':>12} {'median us':>12} {'baseline':>12} {'change':>8}")
+    results, regressions = {}, []
+    for name, fn in cases.items():
+        fn()  # warm: imports, caches, compiled templates
+        best, median = measure(fn, args.repeat)
+        old = baseline.get('cases', {}).get(name)
+        # قبل ما نقول regression نقيس تاني: ضوضاء الجهاز لوحدها ممكن تعدي الـ threshold مرة
+        for _ in range(args.confirm):
+            if not old or (best / old - 1) * 100 <= args.threshold:
+                break
+            best, median = min((best, median), measure(fn, args.repeat))
+        results[name] = round(best, 2)
+        if old:
+            change = (best / old - 1) * 100
+            flag = '  REGRESSED' if change > args.threshold else ''
+            if flag:
+                regressions.append(name)
+            print(f"{name:<22} {best:>12.2f} {median:>12.2f} {old:>12.2f} {change:>+7.1f}%{flag}")
+        else:
+            print(f"{name:<22} {best:>12.2f} {median:>12.2f} {'-':>12} {'new':>8}")
+
+    if args.update:
+        cases_out = dict(baseline.get('cases', {}), **results)
+        payload = {
+            'meta': {
+                'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'cpus': os.cpu_count(),
+                'machine': platform.machine(),
+                'data_version': data.version,
+            },
+            'cases': cases_out,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"baseline written: {args.baseline}")
+        return
+    if regressions:
+        print(f"FAIL {len(regressions)} case(s) slower than baseline by more than {args.threshold}%: {', '.join(regressions)}")
+        raise SystemExit(1)
+    print(f"ok   no case slower than baseline by more than {args.threshold}%")
+
+
+if __name__ == '__main__':
+    main()
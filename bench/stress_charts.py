@@ -0,0 +1,65 @@
+"""Stress check: render charts from many threads and compare with a serial run.
+
+Exits non-zero if any concurrently rendered PNG differs from its serial twin.
+
+Usage:  python bench/stress_charts.py [--threads 16] [--students 48]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import app  # noqa: E402
+import charts  # noqa: E402
+
+data = app.get_data()
+
+
+def render(job):
+    student_id, kind = job
+    record = data.student_index[student_id]
+    if kind == 'distribution':
+        return charts.render_distribution(data.total_scores, record.total, app.CURRENT_TOTAL_MAX)
+    return charts.render_rank_progress(record.ranks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--students', type=int, default=48)
+    args = parser.parse_args()
+
+    ids = list(data.student_index)[:args.students]
+    jobs = [(sid, kind) for sid in ids for kind in app.CHART_KINDS
+            if app.has_chart(data, data.student_index[sid], kind)]
+
+    started = time.perf_counter()
+    serial = [render(job) for job in jobs]
+    serial_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        # كل chart بتترسم مرتين بالتوازي عشان نزود التداخل
+        concurrent = list(pool.map(render, jobs + jobs))
+    threaded_time = time.perf_counter() - started
+
+    mismatches = [job for job, a, b, c in zip(jobs, serial, concurrent, concurrent[len(jobs):])
+                  if not (a == b == c)]
+    print(f"charts      : {len(jobs)} serial, {2 * len(jobs)} on {args.threads} threads")
+    print(f"serial      : {serial_time:.2f}s")
+    print(f"threaded    : {threaded_time:.2f}s")
+    print(f"mismatches  : {len(mismatches)}")
+    if mismatches:
+        for job in mismatches[:10]:
+            print(f"  differs: {job}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Stress check: N parallel registrations against each database engine profile.
+
+Every profile runs in its own process (profiles are chosen at import time)
+against a fresh database: SQLite profiles use a temporary file, Postgres
+profiles need --postgres-url (an empty scratch database; tables are dropped
+and recreated). Password hashing uses the app's defaults (worker pool and
+pending queue), so the burst also checks that no registration is turned
+away as busy. Exits non-zero if any profile loses a registration, returns a
+5xx or rejects a hash. The 'none' profile (SQLAlchemy defaults, no busy
+timeout) is only a reference for what the tuned profiles fix: it is
+expected to hit 'database is locked', so its result is printed but never
+fails the run.
+
+Usage:  python bench/stress_register.py [--n 200] [--profiles sqlite[,none]]
+                                        [--postgres-url postgresql://...]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# بروفايلات للمقارنة بس: نتيجتها بتتطبع ومش بتفشّل الـ run
+REFERENCE_PROFILES = ('none',)
+
+
+def run_child(n):
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from flask import got_request_exception
+
+    import app
+
+    errors = []
+    got_request_exception.connect(lambda sender, exception, **extra: errors.append(repr(exception)), app.app)
+    with app.app.app_context():
+        app.db.drop_all()
+        app.db.create_all()
+    ids = list(app.get_data().student_index)[:n]
+    statuses = []
+    barrier = threading.Barrier(len(ids))
+
+    def register(student_id):
+        client = app.app.test_client()
+        barrier.wait()
+        response = client.post('/register', data={'student_id': student_id, 'password': 'pw'})
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=register, args=(sid,)) for sid in ids]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    with app.app.app_context():
+        created = app.User.query.count()
+    server_errors = sum(1 for s in statuses if s >= 500)
+    busy = app.password_hasher.stats()['busy']
+    app.password_hasher.shutdown()
+    print(f"{app.DB_PROFILE:<20} {len(ids):>5} {created:>8} {server_errors:>6} {busy:>6} {elapsed:>8.2f}s"
+          f"  {errors[0][:80] if errors else ''}")
+    sys.exit(0 if created == len(ids) and not server_errors and not busy else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=200)
+    parser.add_argument('--profiles', default='sqlite',
+                        help='Comma separated; postgres/postgres-serverless need --postgres-url, '
+                             'none is a reference that never fails the run.')
+    parser.add_argument('--postgres-url', default=None)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run_child(args.n)
+
+    print(f"{'profile':<20} {'sent':>5} {'created':>8} {'5xx':>6} {'busy':>6} {'elapsed':>9}  first error")
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in args.profiles.split(','):
+            # كل الطلبات من نفس الـ IP، فالـ rate limit بيتقفل هنا: المقصود ضغط الداتابيز
+            env = dict(os.environ, DB_PROFILE=profile, RATE_LIMIT='0')
+            if profile.startswith('postgres'):
+                if not args.postgres_url:
+                    print(f"{profile:<20} skipped (no --postgres-url)")
+                    continue
+                env['DATABASE_URL'] = args.postgres_url
+            else:
+                env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, f'{profile}.db')
+            result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--n', str(args.n)], env=env)
+            if profile in REFERENCE_PROFILES:
+                print(f"{profile:<20} reference only ({'ok' if result.returncode == 0 else 'failed as expected'})")
+                continue
+            failed |= result.returncode != 0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
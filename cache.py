@@ -0,0 +1,316 @@
+import os
+import ast
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ---------------------------------------------------------
+# BYTES CACHE (LRU IN MEMORY + OPTIONAL DISK TIER)
+# ---------------------------------------------------------
+# كل ملف على الديسك أوله سطر فيه المفتاح نفسه، عشان discard يقدر يطابقه ويمسحه
+# من غير index منفصل (ولو كذا process بيكتبوا في نفس الفولدر)
+_DISK_MAGIC = b'BCK1 '
+_DISK_HEADER_MAX = 64 * 1024
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class BytesCache:
+    """Cache of rendered bytes (e.g. chart PNGs) keyed by any hashable tuple.
+
+    Memory is bounded by total bytes with LRU eviction. If ``disk_dir`` is set,
+    rendered values are also written there and survive process restarts; the
+    disk tier is bounded by ``disk_max_bytes`` (least recently read files go
+    first) and ``discard`` removes matching files as well as memory entries.
+    Keys must be tuples of literals (str, int, bool, ...) so they can be read
+    back from the files. Concurrent misses for the same key render once; the
+    others wait for it.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, disk_dir=None, suffix='.png', disk_max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.suffix = suffix
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_size = sum(size for _, size, _ in self._disk_files())
+
+    def _disk_path(self, key):
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, name + self.suffix)
+
+    @staticmethod
+    def _disk_header(key):
+        return _DISK_MAGIC + repr(key).encode('utf-8') + b'\n'
+
+    def _disk_files(self):
+        """(path, size, mtime) of every finished cache file in ``disk_dir``."""
+        try:
+            entries = list(os.scandir(self.disk_dir))
+        except OSError:
+            return []
+        files = []
+        for entry in entries:
+            if entry.name.endswith(self.suffix):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files.append((entry.path, st.st_size, st.st_mtime))
+        return files
+
+    @staticmethod
+    def _disk_key(path):
+        # None = ملف مش بتاعنا أو بالصيغة القديمة من غير header: مبيتقريش تاني فبيتمسح
+        try:
+            with open(path, 'rb') as f:
+                header = f.readline(_DISK_HEADER_MAX)
+        except OSError:
+            return None
+        if not header.startswith(_DISK_MAGIC) or not header.endswith(b'\n'):
+            return None
+        try:
+            return ast.literal_eval(header[len(_DISK_MAGIC):-1].decode('utf-8'))
+        except (ValueError, SyntaxError, UnicodeDecodeError):
+            return None
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        header = self._disk_header(key)
+        if not data.startswith(header):
+            return None
+        try:
+            os.utime(path)  # الـ mtime هو ترتيب الـ LRU في _prune_disk
+        except OSError:
+            pass
+        return data[len(header):]
+
+    def _write_disk(self, key, value):
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = self._disk_header(key) + value
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Cache Disk Error: {e}")
+            return
+        with self._disk_lock:
+            self._disk_size += len(data)
+            over = self.disk_max_bytes and self._disk_size > self.disk_max_bytes
+        if over:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        # بنمسح لحد 90% من الحد عشان منعملش scan مع كل كتابة
+        with self._disk_lock:
+            files = sorted(self._disk_files(), key=lambda f: f[2])
+            total = sum(size for _, size, _ in files)
+            target = self.disk_max_bytes * 0.9
+            for path, size, _ in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.disk_evictions += 1
+            self._disk_size = total
+
+    def _store(self, key, value):
+        # لازم يتنادى والـ lock ماسك
+        if len(value) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = value
+        self._size += len(value)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def get_or_render(self, key, render):
+        """Return cached bytes for ``key``, calling ``render()`` on a miss.
+
+        ``render`` may return None (nothing to draw); that result is not cached.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                self.hits += 1
+            return flight.value
+
+        try:
+            value = self._read_disk(key) if self.disk_dir else None
+            from_disk = value is not None
+            if not from_disk:
+                value = render()
+                if value is not None and self.disk_dir:
+                    self._write_disk(key, value)
+            with self._lock:
+                if from_disk:
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                if value is not None:
+                    self._store(key, value)
+            flight.value = value
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def discard(self, predicate):
+        """Drop every entry whose key matches ``predicate``, in memory and on disk.
+
+        Returns the number of memory entries plus disk files removed. Disk
+        files whose key cannot be read (foreign or old format) go too.
+        """
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                self._size -= len(self._entries.pop(key))
+        removed = len(stale)
+        if self.disk_dir:
+            with self._disk_lock:
+                for path, size, _ in self._disk_files():
+                    key = self._disk_key(path)
+                    if key is not None and not predicate(key):
+                        continue
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    self._disk_size -= size
+                    removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'inflight': len(self._inflight),
+                'disk_dir': self.disk_dir,
+                'disk_bytes': self._disk_size if self.disk_dir else None,
+                'disk_max_bytes': self.disk_max_bytes if self.disk_dir else None,
+                'disk_evictions': self.disk_evictions,
+            }
+
+
+# ---------------------------------------------------------
+# TTL CACHE (SMALL OBJECTS, E.G. USER PRINCIPALS)
+# ---------------------------------------------------------
+class TTLCache:
+    """Bounded LRU map whose entries expire ``ttl`` seconds after they are put."""
+
+    def __init__(self, max_entries=1024, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires <= now:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'invalidations': self.invalidations,
+            }
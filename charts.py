@@ -0,0 +1,113 @@
+import io
+import os
+import hashlib
+
+# الـ OO API بس (Figure + FigureCanvasAgg) من غير pyplot:
+# مفيش state عالمي، فكل thread بيرسم على الـ Figure بتاعته لوحده
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from dataset import rank_points
+
+# ---------------------------------------------------------
+# RENDERERS (PLOT 1 + PLOT 2) -> PNG BYTES
+# ---------------------------------------------------------
+def _new_axes():
+    fig = Figure(figsize=(8, 5))
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def _to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+def render_distribution(total_scores, student_score, current_total_max):
+    avg_score = total_scores.mean()
+    avg_pct = (avg_score / current_total_max) * 100
+
+    fig, ax = _new_axes()
+    ax.hist(total_scores, bins=20, color='#66b3ff', edgecolor='black')
+    ax.axvline(student_score, color='orange', linestyle='solid', linewidth=2, label=f'Student Score: {student_score}')
+    ax.axvline(avg_score, color='black', linestyle='dashed', linewidth=2, label=f'Class Average ({round(avg_pct, 2)}%)')
+
+    ymax = ax.get_ylim()[1]
+    y_line = ymax * 0.7
+    ax.hlines(y_line, min(avg_score, student_score), max(avg_score, student_score), colors='red', linestyles='dashed', linewidth=2)
+
+    mid_x = (student_score + avg_score) / 2
+    diff_pct = round(abs(student_score - avg_score) / current_total_max * 100, 1)
+    ax.text(mid_x, y_line + ymax * 0.03, f'{diff_pct}%', fontsize=10, fontweight='bold', ha='center', color='red')
+
+    ax.plot([], [], 'r--', label='% above/below average') # Legacy label restoration
+    ax.set_xlabel('Scores')
+    ax.set_ylabel('Number of Students')
+    ax.set_title('Score Distribution with Student Highlighted')
+    ax.legend()
+    return _to_png(fig)
+
+
+def render_rank_progress(rank_data):
+    labels, values, colors = rank_points(rank_data)
+    if not labels:
+        return None
+
+    fig, ax = _new_axes()
+    ax.plot(labels, values, marker='o', linestyle='-', color='black', linewidth=2)
+    for i in range(len(labels)):
+        ax.plot(labels[i], values[i], '3', markersize=10, color=colors[i])
+        ax.text(labels[i], values[i]+0.5, f'{int(values[i])}', ha='center', va='top', fontsize=14, fontweight='bold', color='black', bbox=dict(boxstyle='round,pad=0.4', facecolor='white', edgecolor='black'))
+
+        # Arrow Logic from original code
+        if i > 0:
+            change = values[i-1] - values[i]
+            c_color = 'green' if change > 0 else 'red'
+            sign = '+' if change > 0 else ''
+            arrow = '⬆' if change > 0 else '⬇'
+            mid_x = (i - 0.5)
+            mid_y = (values[i-1] + values[i]) / 2
+            ax.text(mid_x, mid_y + 2.5, f'{arrow} {sign}{abs(int(change))}', fontsize=11, fontweight='bold', color=c_color, ha='center', va='top', bbox=dict(boxstyle='round,pad=0.2', facecolor='white', edgecolor=c_color))
+
+    ax.set_ylabel('Cumulative Rank')
+    ax.set_title('Cumulative Progress Based on Class Rank')
+    ax.invert_yaxis()
+    ax.grid(True)
+    return _to_png(fig)
+
+
+# ---------------------------------------------------------
+# PRERENDER WORKERS (flask prerender-charts)
+# ---------------------------------------------------------
+_worker_total_scores = None
+
+
+def init_prerender_worker(total_scores):
+    global _worker_total_scores
+    _worker_total_scores = total_scores
+
+
+def prerender_chart(task):
+    """Render one chart inside a worker process and write it content-addressed.
+
+    ``task`` is ``(student_id, kind, payload, out_dir)``; returns
+    ``(student_id, kind, filename)`` with ``filename`` None if nothing was drawn.
+    """
+    student_id, kind, payload, out_dir = task
+    if kind == 'distribution':
+        student_score, current_total_max = payload
+        png = render_distribution(_worker_total_scores, student_score, current_total_max)
+    else:
+        png = render_rank_progress(payload)
+    if png is None:
+        return student_id, kind, None
+
+    filename = hashlib.sha256(png).hexdigest()[:32] + '.png'
+    path = os.path.join(out_dir, filename)
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(png)
+        os.replace(tmp, path)
+    return student_id, kind, filename
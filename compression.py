@@ -0,0 +1,234 @@
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Brotli اختياري: من غيره بنضغط gzip بس
+    brotli = None
+
+# ---------------------------------------------------------
+# RESPONSE COMPRESSION (WSGI MIDDLEWARE)
+# ---------------------------------------------------------
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+SKIP_STATUSES = (204, 206, 304)
+ETAG_RE = re.compile(r'(W/)?"([^"]*)"')
+
+
+def accepted_encodings(header):
+    """Encodings the client accepts with q > 0, e.g. {'gzip', 'br'}."""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(header, available=None):
+    accepted = accepted_encodings(header)
+    available = available if available is not None else supported_encodings()
+    for coding in available:
+        if coding in accepted or '*' in accepted:
+            return coding
+    return None
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def encoded_etag(etag, coding):
+    """``"abc"`` -> ``"abc-gzip"``: each encoding gets its own (still strong) validator."""
+    match = ETAG_RE.fullmatch(etag.strip())
+    if match is None:
+        return etag
+    return f'{match.group(1) or ""}"{match.group(2)}-{coding}"'
+
+
+def split_if_none_match(header, codings):
+    """Strip the encoding suffixes from an If-None-Match header.
+
+    Returns the header the app should see and ``{etag: suffixed}`` for the
+    tags that had a suffix, so a 304 can echo the validator the client holds.
+    """
+    suffixed = {}
+
+    def strip(match):
+        weak, tag = match.group(1) or '', match.group(2)
+        for coding in codings:
+            if tag.endswith('-' + coding):
+                plain = f'{weak}"{tag[:-len(coding) - 1]}"'
+                suffixed[plain] = match.group(0)
+                return plain
+        return match.group(0)
+
+    return ETAG_RE.sub(strip, header), suffixed
+
+
+def is_compressible(content_type):
+    return (content_type or '').split(';')[0].strip().lower().startswith(COMPRESSIBLE_TYPES)
+
+
+class _GzipStream:
+    def __init__(self, level):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        return self._z.compress(chunk)
+
+    def flush(self):
+        return self._z.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk):
+        return self._c.process(chunk)
+
+    def flush(self):
+        return self._c.finish()
+
+
+def compressor(coding, gzip_level=6, brotli_quality=5):
+    return _BrotliStream(brotli_quality) if coding == 'br' else _GzipStream(gzip_level)
+
+
+class CompressionMiddleware:
+    """Compress text responses for clients that send ``Accept-Encoding``.
+
+    Responses smaller than ``min_size`` bytes, non-text types (PNG charts,
+    fonts, JPEGs), responses that already carry a ``Content-Encoding`` and
+    ``Cache-Control: no-transform`` pass through untouched. Bodies are
+    compressed chunk by chunk as the app yields them, so large bodies are
+    never buffered whole; only the first ``min_size`` bytes are held when the
+    app does not send a ``Content-Length``. The bytes differ per encoding,
+    so the ETag gets the encoding as a suffix (``"<hash>-gzip"``) and stays
+    strong; the suffix is stripped from ``If-None-Match`` before the app
+    compares it, and a 304 answers with the suffixed tag the client sent.
+    """
+
+    def __init__(self, app, min_size=1024, gzip_level=6, brotli_quality=5):
+        self.app = app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def __call__(self, environ, start_response):
+        suffixed = {}
+        if environ.get('HTTP_IF_NONE_MATCH'):
+            # الـ app بيقارن بالـ ETag الأصلي، من غير اللاحقة بتاعة الـ encoding
+            environ['HTTP_IF_NONE_MATCH'], suffixed = split_if_none_match(
+                environ['HTTP_IF_NONE_MATCH'], ('gzip', 'br'))
+        coding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+        if coding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self._vary(environ, start_response, suffixed)
+
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured['status'], captured['headers'], captured['exc_info'] = status, headers, exc_info
+            return captured.setdefault('written', []).append
+
+        body = self.app(environ, capture)
+        try:
+            status, headers = captured['status'], captured['headers']
+            chunks = iter(body)
+            head = list(captured.get('written', ()))
+            names = {k.lower(): v for k, v in headers}
+            length = names.get('content-length')
+            eligible = (
+                int(status.split(' ', 1)[0]) not in SKIP_STATUSES
+                and is_compressible(names.get('content-type'))
+                and 'content-encoding' not in names
+                and 'no-transform' not in names.get('cache-control', '').lower()
+                and (length is None or int(length) >= self.min_size)
+            )
+            if eligible and length is None:
+                # نقرا لحد min_size بس عشان نعرف الرد صغير ولا لا
+                size = sum(len(c) for c in head)
+                for chunk in chunks:
+                    head.append(chunk)
+                    size += len(chunk)
+                    if size >= self.min_size:
+                        break
+                else:
+                    eligible = False
+        except Exception:
+            if hasattr(body, 'close'):
+                body.close()
+            raise
+
+        if not eligible:
+            start_response(status, self._add_vary(self._not_modified(status, headers, suffixed)), captured['exc_info'])
+            # لو مقريناش حاجة من الـ body نرجعه زي ما هو (يفضل wsgi.file_wrapper شغال للملفات)
+            return self._passthrough(body, head, chunks) if head else body
+
+        headers = [(k, v) for k, v in headers if k.lower() not in ('content-length', 'content-encoding', 'etag')]
+        headers.append(('Content-Encoding', coding))
+        etag = names.get('etag')
+        if etag:
+            headers.append(('ETag', encoded_etag(etag, coding)))
+        start_response(status, self._add_vary(headers), captured['exc_info'])
+        return self._compress(body, head, chunks, compressor(coding, self.gzip_level, self.brotli_quality))
+
+    def _vary(self, environ, start_response, suffixed):
+        def add_vary(status, headers, exc_info=None):
+            return start_response(status, self._add_vary(self._not_modified(status, headers, suffixed)), exc_info)
+        return self.app(environ, add_vary)
+
+    @staticmethod
+    def _not_modified(status, headers, suffixed):
+        # الـ 304 لازم يرجع نفس الـ validator اللي العميل خده مع الـ 200 المضغوط
+        if not suffixed or not status.startswith('304'):
+            return headers
+        return [(k, suffixed.get(v, v) if k.lower() == 'etag' else v) for k, v in headers]
+
+    @staticmethod
+    def _add_vary(headers):
+        for i, (key, value) in enumerate(headers):
+            if key.lower() == 'vary':
+                if 'accept-encoding' not in value.lower():
+                    headers[i] = (key, f"{value}, Accept-Encoding")
+                return headers
+        headers.append(('Vary', 'Accept-Encoding'))
+        return headers
+
+    @staticmethod
+    def _passthrough(body, head, chunks):
+        try:
+            yield from head
+            yield from chunks
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+    @staticmethod
+    def _compress(body, head, chunks, stream):
+        try:
+            for chunk in head:
+                out = stream.compress(chunk)
+                if out:
+                    yield out
+            for chunk in chunks:
+                out = stream.compress(chunk)
+                if out:
+                    yield out
+            yield stream.flush()
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
@@ -0,0 +1,555 @@
+import os
+import re
+import json
+import struct
+import hashlib
+from collections import namedtuple
+from datetime import datetime, timezone
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# LOAD DATA (CSV WITH ARABIC SUPPORT)
+# ---------------------------------------------------------
+STUDENT_FILES = ["data1.csv", "data2.csv"]
+# سنين الإقامة: أي ملف NN.csv جنب التطبيق (24.csv = 2024، 25.csv = 2025، ...)
+RESIDENCY_FILE_RE = re.compile(r'^(\d{2})\.csv$')
+DATA_SNAPSHOT = os.environ.get('DATA_SNAPSHOT', 'data.snapshot')
+
+RANK_COLS = {
+    "FIRST YEAR RANK": ("FIRST YEAR", "#e0f7fa"),
+    "SECOND YEAR RANK C": ("SECOND YEAR", "#fff3e0"),
+    "THIRD YEAR RANK C": ("THIRD YEAR", "#ede7f6"),
+    "FOURTH YEAR RANK C": ("FOURTH YEAR", "#d0e0ff"),
+}
+
+# فهرس ثابت بالـ ID: سجل جاهز لكل طالب بيجمع data1 و data2 مرة واحدة وقت التحميل
+StudentRecord = namedtuple('StudentRecord', ['raw', 'result', 'ranks', 'total', 'rank_points'])
+
+# ترتيب الدفعة بالـ TOTAL: totals_desc[r-1] هو مجموع صاحب الترتيب r، و ids_by_rank نفس الترتيب.
+# سياسة التعادل: الترتيب = 1 + عدد اللي مجموعهم أكبر بالظبط (standard competition "1224")،
+# يعني المتعادلين بياخدوا نفس الترتيب، ومجموع الترتيب r هو الـ r-th أعلى مجموع.
+class RankIndex(namedtuple('RankIndex', ['totals_desc', 'totals_asc', 'ids_by_rank'])):
+    __slots__ = ()
+
+    def rank_of(self, score):
+        n = len(self.totals_asc)
+        return int(n - np.searchsorted(self.totals_asc, score, side='right')) + 1
+
+    def score_at(self, rank):
+        if not 1 <= rank <= len(self.totals_desc):
+            return None
+        return float(self.totals_desc[rank - 1])
+
+    def points_to(self, score, ranks):
+        """Marks between ``score`` and each rank in ``ranks`` (positive = behind).
+
+        Ranks outside 1..n are dropped; returns ``(ranks, points)`` arrays.
+        """
+        ranks = np.asarray(ranks, dtype=np.int64)
+        ranks = ranks[(ranks >= 1) & (ranks <= len(self.totals_desc))]
+        return ranks, self.totals_desc[ranks - 1] - score
+
+# مئين كل طالب في كل عمود رقمي من data1: values[row, col] = % من الدفعة اللي درجتهم أقل منه بالظبط
+# (نفس تعريف (scores < score).mean() * 100)، float32 و NaN لو الدرجة مش موجودة
+class PercentileMatrix(namedtuple('PercentileMatrix', ['columns', 'values', 'row_of'])):
+    __slots__ = ()
+
+    def for_student(self, student_id):
+        row = self.row_of.get(student_id)
+        if row is None:
+            return {}
+        return {col: float(p) for col, p in zip(self.columns, self.values[row]) if p == p}
+
+# فهرس سنة إقامة: الصفوف جاهزة بترتيب الملف، و positions (أرقام صفوف مترتبة) لكل تخصص ولكل STATUS،
+# والـ RANK الرقمي مترتب عشان نطاق الترتيب يبقى searchsorted. الإحصائيات متحسبة مرة واحدة.
+class ResidencyIndex(namedtuple('ResidencyIndex', [
+        'year', 'rows', 'ranks', 'rank_order', 'sorted_ranks',
+        'by_specialty', 'by_status', 'status_counts', 'specialty_stats'])):
+    __slots__ = ()
+
+    def query(self, specialty=None, status=None, rank_min=None, rank_max=None):
+        """Row positions (file order) matching every given filter."""
+        positions = None
+        if specialty:
+            positions = self.by_specialty.get(specialty, _EMPTY_POSITIONS)
+        if status:
+            subset = self.by_status.get(status, _EMPTY_POSITIONS)
+            positions = subset if positions is None else np.intersect1d(positions, subset, assume_unique=True)
+        if rank_min is not None or rank_max is not None:
+            lo = 0 if rank_min is None else np.searchsorted(self.sorted_ranks, rank_min, side='left')
+            hi = len(self.sorted_ranks) if rank_max is None else np.searchsorted(self.sorted_ranks, rank_max, side='right')
+            subset = np.sort(self.rank_order[lo:hi])
+            positions = subset if positions is None else np.intersect1d(positions, subset, assume_unique=True)
+        if positions is None:
+            return np.arange(len(self.rows))
+        return positions
+
+# حدود القبول التاريخية: لكل سنة، آخر ترتيب (cutoff) اتقبل في كل (تخصص، STATUS) مترتبين تصاعدي،
+# فالطالب بترتيب r يوصل لكل اللي الـ cutoff بتاعهم >= r، يعني suffix من المصفوفة بـ searchsorted واحد.
+# بس حالات التسكين الفعلية: "لم يحضر" و"ويتنج" مش تخصص حد وصله
+PLACEMENT_STATUSES = ('بوست', 'بدون بوست')
+YearCutoffs = namedtuple('YearCutoffs', ['year', 'keys', 'cutoffs', 'best'])
+
+
+class CutoffIndex(namedtuple('CutoffIndex', ['years'])):
+    __slots__ = ()
+
+    def reachable_from(self, ranks):
+        """Batch mode: for every rank, the first reachable position in each year.
+
+        Returns ``{year: starts}`` with ``starts`` aligned to ``ranks``; entries
+        ``keys[start:]`` of that year are reachable (``len(keys)`` means none).
+        """
+        ranks = np.asarray(ranks, dtype='float64')
+        return {yc.year: np.searchsorted(yc.cutoffs, ranks, side='left') for yc in self.years}
+
+    def expand(self, year_cutoffs, start, rank):
+        """Reachable entries of one year from ``start``, tightest cutoff first."""
+        return [
+            {'specialty': specialty, 'status': status, 'cutoff': int(cutoff),
+             'best_rank': int(best), 'margin': int(cutoff - rank)}
+            for (specialty, status), cutoff, best in zip(
+                year_cutoffs.keys[start:], year_cutoffs.cutoffs[start:], year_cutoffs.best[start:])
+        ]
+
+    def predict(self, rank):
+        # مفيش trend بين السنين: أسماء التخصصات في كل ملف مكتوبة بشكل مختلف تمامًا
+        # (رسمي في 24 ومختصر في 25)، فمقارنتها بالاسم كانت بتطلع نتايج ناقصة
+        starts = self.reachable_from([rank])
+        years = {yc.year: self.expand(yc, int(starts[yc.year][0]), rank) for yc in self.years}
+        return {'rank': int(rank), 'years': years}
+
+
+Dataset = namedtuple('Dataset', [
+    'sheet1_df', 'sheet2_df', 'residency_frames', 'residency', 'cutoffs',
+    'student_index', 'total_scores', 'totals_digest', 'rank_index', 'percentiles',
+    'version', 'modified_at',
+])
+
+
+_EMPTY_POSITIONS = np.array([], dtype=np.int64)
+
+
+def data_files():
+    """Every source file the dataset is built from, residency years included."""
+    return STUDENT_FILES + [f"{year[2:]}.csv" for year in residency_years()]
+
+
+def residency_years():
+    years = []
+    for name in os.listdir('.'):
+        match = RESIDENCY_FILE_RE.match(name)
+        if match:
+            years.append('20' + match.group(1))
+    return sorted(years)
+
+
+def format_record(raw):
+    formatted = {}
+    for k, v in raw.items():
+        if isinstance(v, float):
+            if '%' in k or k.upper() in ['%', 'PERCENTAGE']:
+                formatted[k] = f"{round(v*100, 2)}%" if v <= 1 else f"{round(v, 2)}%"
+            elif v.is_integer():
+                formatted[k] = int(v)
+            else:
+                formatted[k] = round(v, 2)
+        else:
+            formatted[k] = v
+    return formatted
+
+
+def rank_points(rank_data):
+    labels, values, colors = [], [], []
+    for col, (lbl, clr) in RANK_COLS.items():
+        val = rank_data.get(col)
+        if pd.notna(val):
+            try:
+                # إجبار القيمة إنها تكون رقم عشان نتفادى خطأ الـ string
+                numeric_val = float(val)
+                labels.append(lbl)
+                values.append(numeric_val)
+                colors.append(clr)
+            except ValueError:
+                pass # لو الخانة فاضية أو فيها كلام مش رقم، يتجاهلها
+    return labels, values, colors
+
+
+def build_student_index(df1, df2):
+    ranks = {}
+    if not df2.empty:
+        for row in df2.to_dict('records'):
+            ranks.setdefault(row['ID'], MappingProxyType(row))
+    index = {}
+    if not df1.empty:
+        for row in df1.to_dict('records'):
+            if row['ID'] in index:
+                continue  # نفس سلوك match.iloc[0]: أول صف بس
+            total = row.get('TOTAL')
+            rank_row = ranks.get(row['ID'])
+            points = rank_points(rank_row) if rank_row is not None else ([], [], [])
+            index[row['ID']] = StudentRecord(
+                raw=MappingProxyType(row),
+                result=MappingProxyType(format_record(row)),
+                ranks=rank_row,
+                total=total if pd.notna(total) else None,
+                rank_points=tuple(tuple(p) for p in points),
+            )
+    return MappingProxyType(index)
+
+
+def build_rank_index(df1):
+    if df1.empty:
+        empty = np.array([], dtype='float64')
+        return RankIndex(empty, empty, np.array([], dtype=object))
+    valid = df1[df1['TOTAL'].notna()]
+    totals = valid['TOTAL'].to_numpy(dtype='float64')
+    order = np.argsort(-totals, kind='stable')
+    totals_desc = totals[order]
+    totals_desc.flags.writeable = False
+    totals_asc = np.ascontiguousarray(totals_desc[::-1])
+    totals_asc.flags.writeable = False
+    ids_by_rank = valid['ID'].to_numpy(dtype=object)[order]
+    ids_by_rank.flags.writeable = False
+    return RankIndex(totals_desc, totals_asc, ids_by_rank)
+
+
+def need_curve(rank_index, curr_total, current_max, final_max, remaining_max, step=0.5):
+    """Required remaining marks for every target % from the current % up to 100%.
+
+    Each point is ``[target_pct, required_marks, required_pct, projected_rank]``.
+    The projected rank assumes the rest of the cohort keeps its current pace
+    (current total scaled to ``final_max``) and uses the same tie policy as
+    ``RankIndex.rank_of``.
+    """
+    curr_pct = curr_total / current_max * 100
+    start = np.ceil(curr_pct / step) * step
+    targets = np.arange(start, 100 + step / 2, step)
+    targets = targets[targets <= 100]
+    final_totals = targets / 100 * final_max
+    required = final_totals - curr_total
+    required_pct = required / remaining_max * 100
+
+    projected_asc = rank_index.totals_asc / current_max * final_max
+    above = len(projected_asc) - np.searchsorted(projected_asc, final_totals, side='right')
+    # الطالب نفسه جوه الدفعة بمجموعه الحالي، ميتحسبش فوق نفسه
+    own_projected = curr_total / current_max * final_max
+    above -= (own_projected > final_totals) & (len(projected_asc) > 0)
+    ranks = above + 1
+
+    points = np.column_stack([targets, np.round(required, 2), np.round(required_pct, 2), ranks])
+    return {
+        'current_total': round(float(curr_total), 2),
+        'current_percentage': round(float(curr_pct), 2),
+        'step': step,
+        'points': [[float(t), float(m), float(p), int(r)] for t, m, p, r in points],
+    }
+
+
+def build_percentile_matrix(df1):
+    if df1.empty:
+        return PercentileMatrix((), np.zeros((0, 0), dtype=np.float32), MappingProxyType({}))
+    # عمود الـ RANK مش درجة، والـ PERCENTAGE نص ونفس الـ TOTAL
+    columns = tuple(col for col in df1.columns
+                    if col != 'ID' and 'RANK' not in col.upper()
+                    and pd.api.types.is_numeric_dtype(df1[col].dtype))
+    scores = df1[list(columns)]
+    # rank(method='min') - 1 = عدد اللي أقل بالظبط؛ القسمة على عدد الدرجات الموجودة في العمود
+    below = scores.rank(method='min') - 1
+    values = (below / scores.notna().sum() * 100).to_numpy(dtype=np.float32)
+    values.flags.writeable = False
+    row_of = {}
+    for i, student_id in enumerate(df1['ID']):
+        row_of.setdefault(student_id, i)
+    return PercentileMatrix(columns, values, MappingProxyType(row_of))
+
+
+def build_cutoff_index(residency):
+    years = []
+    for year, index in residency.items():
+        cutoffs = {}
+        for specialty, positions in index.by_specialty.items():
+            if not specialty:
+                continue
+            for status in PLACEMENT_STATUSES:
+                status_positions = index.by_status.get(status, _EMPTY_POSITIONS)
+                ranks = index.ranks[np.intersect1d(positions, status_positions, assume_unique=True)]
+                ranks = ranks[~np.isnan(ranks)]
+                if len(ranks):
+                    cutoffs[(specialty, status)] = (ranks.max(), ranks.min())
+        keys = sorted(cutoffs, key=lambda k: (cutoffs[k][0], k))
+        cutoff_arr = np.array([cutoffs[k][0] for k in keys], dtype='float64')
+        best_arr = np.array([cutoffs[k][1] for k in keys], dtype='float64')
+        cutoff_arr.flags.writeable = False
+        best_arr.flags.writeable = False
+        years.append(YearCutoffs(year, tuple(keys), cutoff_arr, best_arr))
+    return CutoffIndex(tuple(years))
+
+
+def student_rank(record):
+    """The student's overall class rank (TOTAL RANK), or None."""
+    value = record.raw.get('TOTAL RANK')
+    return None if pd.isna(value) else float(value)
+
+
+def compute_data_version(paths):
+    # نسخة الداتا: hash لمحتوى الملفات، أي كاش مشتق من الداتا بيتربط بيها
+    h = hashlib.sha256()
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        except OSError:
+            h.update(b'missing:' + path.encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def load_student_frames():
+    try:
+        sheet1_df = pd.read_csv("data1.csv", encoding='utf-8-sig')
+        sheet2_df = pd.read_csv("data2.csv", encoding='utf-8-sig')
+
+        # السطرين الجداد دول لتنظيف أسماء الأعمدة من أي مسافات مخفية
+        sheet1_df.columns = sheet1_df.columns.str.strip()
+        sheet2_df.columns = sheet2_df.columns.str.strip()
+
+        # تنظيف الـ IDs
+        sheet1_df['ID'] = sheet1_df['ID'].astype(str).str.strip()
+        sheet2_df['ID'] = sheet2_df['ID'].astype(str).str.strip()
+    except Exception as e:
+        print(f"Data Error: {e}")
+        sheet1_df = pd.DataFrame()
+        sheet2_df = pd.DataFrame()
+    return sheet1_df, sheet2_df
+
+
+def load_residency_frames():
+    frames = {}
+    for year in residency_years():
+        try:
+            frames[year] = pd.read_csv(f"{year[2:]}.csv", encoding='utf-8-sig')
+        except Exception as e:
+            print(f"Residency Data Error: {e}")
+            frames[year] = pd.DataFrame()
+    return frames
+
+
+def parse_rank(value):
+    # "88 مكرر" -> 88، و "دور ابريل" مالوش ترتيب رقمي
+    match = re.match(r'\s*(\d+)', str(value)) if pd.notna(value) else None
+    return float(match.group(1)) if match else np.nan
+
+
+def build_residency_index(year, df):
+    if df.empty:
+        return ResidencyIndex(year, (), np.array([], dtype='float64'), _EMPTY_POSITIONS,
+                              np.array([], dtype='float64'), MappingProxyType({}), MappingProxyType({}),
+                              MappingProxyType({}), ())
+    rows = tuple(df.to_dict('records'))
+    ranks = np.array([parse_rank(r.get('RANK')) for r in rows], dtype='float64')
+    numeric = np.flatnonzero(~np.isnan(ranks))
+    rank_order = numeric[np.argsort(ranks[numeric], kind='stable')]
+    sorted_ranks = ranks[rank_order]
+
+    by_specialty, by_status = {}, {}
+    for i, r in enumerate(rows):
+        specialty = str(r.get('RESIDENCY')).strip() if pd.notna(r.get('RESIDENCY')) else ''
+        status = str(r.get('STATUS')).strip() if pd.notna(r.get('STATUS')) else ''
+        by_specialty.setdefault(specialty, []).append(i)
+        by_status.setdefault(status, []).append(i)
+    by_specialty = {k: np.array(v, dtype=np.int64) for k, v in by_specialty.items()}
+    by_status = {k: np.array(v, dtype=np.int64) for k, v in by_status.items()}
+
+    post = by_status.get('بوست', _EMPTY_POSITIONS)
+    no_post = by_status.get('بدون بوست', _EMPTY_POSITIONS)
+    specialty_stats = []
+    for specialty, positions in by_specialty.items():
+        specialty_ranks = ranks[positions]
+        specialty_ranks = specialty_ranks[~np.isnan(specialty_ranks)]
+        specialty_stats.append({
+            'specialty': specialty,
+            'count': len(positions),
+            'post': int(np.isin(positions, post).sum()),
+            'no_post': int(np.isin(positions, no_post).sum()),
+            'min_rank': int(specialty_ranks.min()) if len(specialty_ranks) else None,
+            'max_rank': int(specialty_ranks.max()) if len(specialty_ranks) else None,
+        })
+    specialty_stats.sort(key=lambda st: (st['min_rank'] is None, st['min_rank'] or 0, st['specialty']))
+
+    for arr in (ranks, rank_order, sorted_ranks, *by_specialty.values(), *by_status.values()):
+        arr.flags.writeable = False
+    return ResidencyIndex(
+        year=year,
+        rows=rows,
+        ranks=ranks,
+        rank_order=rank_order,
+        sorted_ranks=sorted_ranks,
+        by_specialty=MappingProxyType(by_specialty),
+        by_status=MappingProxyType(by_status),
+        status_counts=MappingProxyType({k: len(v) for k, v in by_status.items()}),
+        specialty_stats=tuple(MappingProxyType(st) for st in specialty_stats),
+    )
+
+
+# ---------------------------------------------------------
+# BINARY SNAPSHOT (flask build-snapshot)
+# ---------------------------------------------------------
+# نفس الداتا بعد التنظيف في ملف واحد: الأعمدة الرقمية arrays جاهزة (np.frombuffer من غير parsing)
+# والنصوص (الأسماء والتخصصات بالعربي) في جدول strings واحد والعمود نفسه int32 codes.
+# الـ header فيه hash محتوى الـ CSVs، لو اتغيروا الـ snapshot بيتجاهل ونرجع للـ CSV.
+SNAPSHOT_MAGIC = b'AFMSNAP\x00'
+SNAPSHOT_FORMAT = 2
+
+
+def _align8(n):
+    return (n + 7) & ~7
+
+
+def write_snapshot(path, frames, content_hash):
+    """Write cleaned frames (name -> DataFrame) to a versioned binary snapshot."""
+    strings, string_ids = [], {}
+    buffers, layout = [], {}
+    offset = 0
+
+    def add_buffer(raw):
+        nonlocal offset
+        start = offset
+        buffers.append(raw + b'\x00' * (_align8(len(raw)) - len(raw)))
+        offset += _align8(len(raw))
+        return start, len(raw)
+
+    for name, df in frames.items():
+        columns = []
+        for col in df.columns:
+            series = df[col]
+            if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+                arr = np.ascontiguousarray(series.to_numpy())
+                kind, dtype = 'num', arr.dtype.str
+            else:
+                codes = np.full(len(series), -1, dtype=np.int32)
+                for i, value in enumerate(series.tolist()):
+                    if pd.notna(value):
+                        value = str(value)
+                        if value not in string_ids:
+                            string_ids[value] = len(strings)
+                            strings.append(value)
+                        codes[i] = string_ids[value]
+                arr, kind, dtype = codes, 'str', codes.dtype.str
+            start, nbytes = add_buffer(arr.tobytes())
+            columns.append({'name': col, 'kind': kind, 'dtype': dtype, 'offset': start, 'nbytes': nbytes})
+        layout[name] = {'rows': len(df), 'columns': columns}
+
+    blob_start, blob_len = add_buffer('\x00'.join(strings).encode('utf-8'))
+    header = json.dumps({
+        'format': SNAPSHOT_FORMAT,
+        'content_hash': content_hash,
+        'frames': layout,
+        'strings': {'offset': blob_start, 'nbytes': blob_len, 'count': len(strings)},
+    }, ensure_ascii=False).encode('utf-8')
+    prefix = SNAPSHOT_MAGIC + struct.pack('<I', len(header)) + header
+    prefix += b'\x00' * (_align8(len(prefix)) - len(prefix))
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(prefix)
+        for buf in buffers:
+            f.write(buf)
+    os.replace(tmp, path)
+
+
+def read_snapshot_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError('not a data snapshot')
+        (size,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(size).decode('utf-8'))
+    if header.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"unsupported snapshot format {header.get('format')}")
+    base = _align8(len(SNAPSHOT_MAGIC) + 4 + size)
+    return header, base
+
+
+def read_snapshot(path):
+    """Load a snapshot written by ``write_snapshot``; returns (content_hash, frames)."""
+    header, base = read_snapshot_header(path)
+    with open(path, 'rb') as f:
+        raw = f.read()
+    data = memoryview(raw)[base:]
+
+    meta = header['strings']
+    blob = bytes(data[meta['offset']:meta['offset'] + meta['nbytes']]).decode('utf-8')
+    strings = np.array(blob.split('\x00') if meta['count'] else [], dtype=object)
+    # -1 (خانة فاضية) بتقع على آخر عنصر = NaN
+    lookup = np.append(strings, np.nan)
+
+    frames = {}
+    for name, frame in header['frames'].items():
+        columns = {}
+        for col in frame['columns']:
+            arr = np.frombuffer(data, dtype=np.dtype(col['dtype']), count=frame['rows'], offset=col['offset'])
+            columns[col['name']] = lookup[arr] if col['kind'] == 'str' else arr
+        frames[name] = pd.DataFrame(columns, columns=[c['name'] for c in frame['columns']])
+    return header['content_hash'], frames
+
+
+def build_snapshot(path=DATA_SNAPSHOT):
+    sheet1_df, sheet2_df = load_student_frames()
+    frames = {'sheet1_df': sheet1_df, 'sheet2_df': sheet2_df}
+    for year, df in load_residency_frames().items():
+        frames[f'residency_{year}'] = df
+    content_hash = compute_data_version(data_files())
+    write_snapshot(path, frames, content_hash)
+    return content_hash, frames
+
+
+def load_frames(version):
+    """Return (sheet1_df, sheet2_df, {year: residency_df})."""
+    # الـ snapshot لو موجود ومتطابق مع الـ CSVs الحالية، غير كده CSV زي الأول
+    if DATA_SNAPSHOT and os.path.exists(DATA_SNAPSHOT):
+        try:
+            content_hash, frames = read_snapshot(DATA_SNAPSHOT)
+            if content_hash == version:
+                residency = {name[len('residency_'):]: df for name, df in frames.items()
+                             if name.startswith('residency_')}
+                return frames['sheet1_df'], frames['sheet2_df'], residency
+            print(f"Snapshot Warning: {DATA_SNAPSHOT} is stale, loading CSV files")
+        except Exception as e:
+            print(f"Snapshot Error: {e}")
+    sheet1_df, sheet2_df = load_student_frames()
+    return sheet1_df, sheet2_df, load_residency_frames()
+
+
+def load_dataset(version=None):
+    """Build the full Dataset; ``version`` skips re-hashing when the caller has it."""
+    files = data_files()
+    version = version or compute_data_version(files)
+    sheet1_df, sheet2_df, residency_frames = load_frames(version)
+
+    if not sheet1_df.empty:
+        total_scores = sheet1_df['TOTAL'].dropna()
+        totals_digest = hashlib.sha1(total_scores.to_numpy().tobytes()).hexdigest()
+    else:
+        total_scores = pd.Series(dtype='float64')
+        totals_digest = ''
+
+    residency = MappingProxyType({year: build_residency_index(year, df) for year, df in residency_frames.items()})
+    mtimes = [os.path.getmtime(p) for p in files if os.path.exists(p)]
+    modified_at = datetime.fromtimestamp(max(mtimes or [0]), tz=timezone.utc).replace(microsecond=0)
+
+    return Dataset(
+        sheet1_df=sheet1_df,
+        sheet2_df=sheet2_df,
+        residency_frames=MappingProxyType(residency_frames),
+        residency=residency,
+        cutoffs=build_cutoff_index(residency),
+        student_index=build_student_index(sheet1_df, sheet2_df),
+        total_scores=total_scores,
+        totals_digest=totals_digest,
+        rank_index=build_rank_index(sheet1_df),
+        percentiles=build_percentile_matrix(sheet1_df),
+        version=version,
+        modified_at=modified_at,
+    )
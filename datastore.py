@@ -0,0 +1,139 @@
+import os
+import time
+import threading
+
+# ---------------------------------------------------------
+# DATA STORE (HOT RELOAD WITH ATOMIC SWAP)
+# ---------------------------------------------------------
+class DataStore:
+    """Holds the current dataset and swaps in a new one when its sources change.
+
+    ``load(version)`` builds a dataset (``version`` may be None on first load),
+    ``sources()`` lists the files it is built from and ``fingerprint(paths)``
+    returns their content hash, which must equal the built dataset's
+    ``version``. Every ``check_interval`` seconds ``get()`` stats the sources;
+    if a size or mtime moved, the content is re-hashed and, when it really
+    changed, the new dataset is built on a background thread and published
+    with a single reference swap. Requests that already hold the old dataset
+    keep using it. ``validate(dataset)`` can veto a rebuild (e.g. a half
+    written CSV) and ``on_swap(old, new)`` runs after each swap, and once
+    after the first load with ``old`` set to None.
+    """
+
+    def __init__(self, load, sources, fingerprint, check_interval=5.0, validate=None, on_swap=None):
+        self._load = load
+        self._sources = sources
+        self._fingerprint = fingerprint
+        self.check_interval = check_interval
+        self._validate = validate
+        self._on_swap = on_swap
+        self._current = None
+        self._stamp = None
+        self._next_check = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self.checks = 0
+        self.reloads = 0
+        self.rejected = 0
+        self.loaded_at = None
+        self.last_error = None
+
+    @staticmethod
+    def _stat(paths):
+        stamp = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stamp.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append((path, None, None))
+        return tuple(stamp)
+
+    def get(self):
+        current = self._current
+        if current is None:
+            loaded = False
+            with self._lock:
+                if self._current is None:
+                    stamp = self._stat(self._sources())
+                    self._current = self._load(None)
+                    self._stamp = stamp
+                    self.loaded_at = time.time()
+                    self._next_check = time.monotonic() + self.check_interval
+                    loaded = True
+                current = self._current
+            if loaded and self._on_swap is not None:
+                self._on_swap(None, current)
+        elif self.check_interval > 0 and time.monotonic() >= self._next_check:
+            self._maybe_reload()
+        return current
+
+    def _maybe_reload(self):
+        # الـ stat رخيص، والـ hash والتحميل نفسه بيحصلوا في thread لوحده
+        with self._lock:
+            now = time.monotonic()
+            if self._reloading or now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            self.checks += 1
+            stamp = self._stat(self._sources())
+            if stamp == self._stamp:
+                return
+            self._reloading = True
+        threading.Thread(target=self._background_reload, args=(stamp,), name='data-reload', daemon=True).start()
+
+    def _background_reload(self, stamp):
+        try:
+            self.reload(stamp)
+        except Exception as e:
+            print(f"Data Reload Error: {e}")
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def reload(self, stamp=None):
+        """Rebuild now if the source content changed; return True if swapped."""
+        with self._reload_lock:
+            if stamp is None:
+                stamp = self._stat(self._sources())
+            try:
+                version = self._fingerprint([path for path, _, _ in stamp])
+                old = self._current
+                if old is not None and version == old.version:
+                    # اتلمس بس المحتوى زي ما هو
+                    with self._lock:
+                        self._stamp = stamp
+                    return False
+                new = self._load(version)
+                if self._validate is not None and not self._validate(new):
+                    self.rejected += 1
+                    raise ValueError(f"rebuilt dataset {version} failed validation; keeping {old and old.version}")
+            except Exception as e:
+                # متحاولش تاني لحد ما الملفات تتغير تاني
+                with self._lock:
+                    self._stamp = stamp
+                self.last_error = str(e)
+                raise
+            with self._lock:
+                self._current = new
+                self._stamp = stamp
+                self.reloads += 1
+                self.loaded_at = time.time()
+                self.last_error = None
+            if self._on_swap is not None:
+                self._on_swap(old, new)
+            return True
+
+    def stats(self):
+        current = self._current
+        return {
+            'version': current.version if current is not None else None,
+            'loaded_at': self.loaded_at,
+            'check_interval': self.check_interval,
+            'checks': self.checks,
+            'reloads': self.reloads,
+            'rejected': self.rejected,
+            'reloading': self._reloading,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,147 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# ---------------------------------------------------------
+# PASSWORD HASHING (POLICY + BOUNDED WORKER POOL)
+# ---------------------------------------------------------
+# طابور الـ hashes مش هو اللي بيحدد الحمل (الـ workers بيحددوه)، فبيتعمل كبير كفاية
+# لموجة تسجيل يوم النتيجة: الطلبات بتستنى دورها بدل ما ترجع 503
+DEFAULT_MAX_PENDING = 512
+
+
+class HashingBusy(Exception):
+    """Every hashing slot stayed taken for longer than the wait timeout."""
+
+
+def normalize_method(method):
+    """Spell out werkzeug's defaults, e.g. 'scrypt' -> 'scrypt:32768:8:1'.
+
+    This is the exact prefix werkzeug stores before the first ``$``, so a
+    stored hash can be compared with the policy as a plain string.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Unknown password hash method {method!r}; expected scrypt[:n:r:p] or pbkdf2[:hash:iterations]")
+
+
+class PasswordHasher:
+    """Hash and verify passwords with one configured policy.
+
+    With ``workers`` > 0 the KDF runs in a process pool of that size, so a
+    burst of logins costs at most ``workers`` cores and never holds the GIL of
+    the web process. Up to ``max_pending`` hashes (default
+    ``DEFAULT_MAX_PENDING``, sized for a results-day burst, not for
+    ``workers``) queue for the pool and simply wait their turn; callers
+    beyond that wait up to ``wait_timeout`` seconds for a place in the queue
+    and then get ``HashingBusy`` instead of piling up without bound. ``workers=0`` hashes inline
+    on the calling thread (serverless instances, tests), and so does a hasher
+    whose pool broke. ``needs_rehash`` tells whether a stored hash was made
+    with other parameters than the current policy, so logins can upgrade it
+    while the plain password is known.
+    """
+
+    def __init__(self, method='scrypt', salt_length=16, workers=0, max_pending=None, wait_timeout=10.0):
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = max(0, workers)
+        self.max_pending = max_pending or DEFAULT_MAX_PENDING
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending) if self.workers else None
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hashes = 0
+        self.verifies = 0
+        self.busy = 0
+        self.pool_failures = 0
+        self.seconds = 0.0
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn مش fork: الـ process الأب فيه threads واتصالات داتابيز
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _run(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            if not self.workers:
+                return fn(*args)
+            if not self._slots.acquire(timeout=self.wait_timeout):
+                with self._stats_lock:
+                    self.busy += 1
+                raise HashingBusy(f"{self.max_pending} password hashes already pending")
+            try:
+                return self._executor().submit(fn, *args).result()
+            except BrokenProcessPool as e:
+                # الـ workers مش قادرة تشتغل (OOM، أو spawn مش لاقي الـ __main__):
+                # بنكمل inline بدل ما نبدأ processes جديدة مع كل login
+                print(f"Password Pool Error: {e}")
+                self.workers = 0
+                self.pool_failures += 1
+                return fn(*args)
+            finally:
+                self._slots.release()
+        finally:
+            with self._stats_lock:
+                self.seconds += time.perf_counter() - started
+
+    def hash(self, password):
+        with self._stats_lock:
+            self.hashes += 1
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, stored, password):
+        if not stored or password is None:
+            return False
+        with self._stats_lock:
+            self.verifies += 1
+        return self._run(check_password_hash, stored, password)
+
+    def needs_rehash(self, stored):
+        method, _, rest = (stored or '').partition('$')
+        salt = rest.partition('$')[0]
+        try:
+            return normalize_method(method) != self.method or len(salt) != self.salt_length
+        except ValueError:
+            return True
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def stats(self):
+        calls = self.hashes + self.verifies
+        return {
+            'method': self.method,
+            'salt_length': self.salt_length,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'hashes': self.hashes,
+            'verifies': self.verifies,
+            'busy': self.busy,
+            'pool_failures': self.pool_failures,
+            'avg_ms': round(self.seconds / calls * 1000, 1) if calls else None,
+        }
+
+
+def default_workers():
+    # على Vercel كل instance بـ request واحد، فمفيش داعي لـ processes زيادة
+    if os.environ.get('VERCEL'):
+        return 0
+    return min(4, os.cpu_count() or 1)